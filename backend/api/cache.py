@@ -0,0 +1,132 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+
+CONTENT_VERSION_KEY = "api:content-version"
+USER_VERSION_KEY = "api:user-version:{}"
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Vary")
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock, so an evicted version never reuses a number
+        # that older cached responses were stored under.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def get_content_version():
+    return get_version(CONTENT_VERSION_KEY)
+
+
+def bump_content_version():
+    bump_version(CONTENT_VERSION_KEY)
+
+
+def get_user_version(user_id):
+    """Version of a user's favorites, shopping cart and subscriptions."""
+    return get_version(USER_VERSION_KEY.format(user_id))
+
+
+def bump_user_version(user_id):
+    bump_version(USER_VERSION_KEY.format(user_id))
+
+
+def response_cache_key(request):
+    # The Accept header picks the renderer, so it is part of the key.
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    accept = request.META.get("HTTP_ACCEPT", "")
+    digest = hashlib.md5(
+        f"{request.path}?{query}\n{accept}".encode(), usedforsecurity=False
+    ).hexdigest()
+    return f"api:response:{get_content_version()}:{digest}"
+
+
+class AnonymousResponseCacheMixin:
+    """Cache successful anonymous GET responses of the listed actions.
+
+    Keys include a global content version bumped by the signals in
+    api/signals.py, so any content change invalidates every entry at
+    once. Requests carrying credentials are never cached because their
+    responses contain per-user flags. Only application/json responses
+    are stored, so the browsable API never fills the cache.
+    """
+
+    cached_actions = ("list", "retrieve")
+
+    def dispatch(self, request, *args, **kwargs):
+        action = self.action_map.get(request.method.lower())
+        if (
+            request.method != "GET"
+            or action not in self.cached_actions
+            or "HTTP_AUTHORIZATION" in request.META
+        ):
+            return super().dispatch(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = response_cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            return self.cached_response(request, *cached)
+
+        response = super().dispatch(request, *args, **kwargs)
+
+        def store(response):
+            if response.status_code == 200 and response.get(
+                "Content-Type", ""
+            ).startswith("application/json"):
+                headers = {
+                    header: response[header]
+                    for header in CACHED_HEADERS
+                    if response.has_header(header)
+                }
+                cache.set(
+                    key,
+                    (response.content, headers),
+                    settings.RESPONSE_CACHE_TIMEOUT,
+                )
+
+        if hasattr(response, "add_post_render_callback"):
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+
+        return response
+
+    @staticmethod
+    def cached_response(request, content, headers):
+        response = get_conditional_response(
+            request,
+            etag=headers.get("ETag"),
+            last_modified=parse_http_date_safe(
+                headers.get("Last-Modified", "")
+            ),
+        )
+        if response is None:
+            response = HttpResponse(content)
+
+        for header, value in headers.items():
+            response[header] = value
+
+        return response
@@ -0,0 +1,56 @@
+import hashlib
+
+from django.utils.cache import (get_conditional_response,
+                                patch_vary_headers, quote_etag)
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    return quote_etag(
+        hashlib.md5(
+            repr(parts).encode(), usedforsecurity=False
+        ).hexdigest()
+    )
+
+
+class ConditionalGetMixin:
+    """Answer conditional list/retrieve requests before serializing.
+
+    Views implement get_validators(request, *args, **kwargs) returning an
+    (etag, last_modified datetime or None) pair taken from versions kept
+    in the cache or in memory, not from the database; If-None-Match and
+    If-Modified-Since are then answered with 304 without running the
+    serializer.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, *args, **kwargs)
+        last_modified = last_modified and int(last_modified.timestamp())
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            if etag:
+                response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+        patch_vary_headers(response, ("Authorization",))
+
+        return response
+
+    def get_validators(self, request, *args, **kwargs):
+        raise NotImplementedError
@@ -1,14 +1,28 @@
-import base64
-
-from django.core.files.base import ContentFile
 from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+
+from api.images import variant_urls
 
 
 class Bit64ImageField(Base64ImageField):
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
-            ext = format.split("/")[-1]
-            data = ContentFile(base64.b64decode(imgstr), name="photo." + ext)
+    """Image sent as a data:image/...;base64 string, decoded once."""
+
+
+class ImageVariantsField(serializers.Field):
+    """Read-only URLs of the thumbnail and WebP variants of an image."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value:
+            return None
 
-        return super().to_internal_value(data)
+        request = self.context.get("request")
+        return {
+            variant: (
+                request.build_absolute_uri(url) if request is not None else url
+            )
+            for variant, url in variant_urls(value).items()
+        }
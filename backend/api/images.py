@@ -0,0 +1,104 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image
+
+from foodgram.constants import (IMAGE_THUMBNAIL_SIZE, IMAGE_VARIANTS_DIR,
+                                IMAGE_VARIANTS_QUALITY)
+
+logger = logging.getLogger(__name__)
+
+# Variant name -> (bounding box or None for full size, format or None to
+# keep the format of the original).
+IMAGE_VARIANTS = {
+    "thumbnail": (IMAGE_THUMBNAIL_SIZE, None),
+    "webp": (None, "WEBP"),
+    "thumbnail_webp": (IMAGE_THUMBNAIL_SIZE, "WEBP"),
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_VARIANTS_WORKERS,
+            thread_name_prefix="image-variants",
+        )
+    return _executor
+
+
+def variant_name(name, variant):
+    path = PurePosixPath(name)
+    fmt = IMAGE_VARIANTS[variant][1]
+    suffix = f".{fmt.lower()}" if fmt else path.suffix
+    stem = path.stem if variant == "webp" else f"{path.stem}_{variant}"
+    return str(path.parent / IMAGE_VARIANTS_DIR / f"{stem}{suffix}")
+
+
+def generate_variants(storage, name):
+    missing = [
+        variant
+        for variant in IMAGE_VARIANTS
+        if not storage.exists(variant_name(name, variant))
+    ]
+    if not missing:
+        return
+
+    try:
+        with storage.open(name) as file:
+            image = Image.open(file)
+            image.load()
+    except OSError:
+        logger.warning("Cannot build variants of %s", name, exc_info=True)
+        return
+
+    for variant in missing:
+        size, fmt = IMAGE_VARIANTS[variant]
+        fmt = fmt or image.format
+        copy = image.copy()
+        if size:
+            copy.thumbnail(size)
+        if fmt == "JPEG" and copy.mode not in ("RGB", "L"):
+            copy = copy.convert("RGB")
+        elif fmt == "WEBP" and copy.mode not in ("RGB", "RGBA"):
+            copy = copy.convert("RGBA")
+
+        buffer = BytesIO()
+        copy.save(buffer, format=fmt, quality=IMAGE_VARIANTS_QUALITY)
+        storage.save(
+            variant_name(name, variant), ContentFile(buffer.getvalue())
+        )
+
+
+def schedule_variants(field_file):
+    """Build the variants in the worker pool once the upload is committed."""
+    if field_file:
+        transaction.on_commit(
+            partial(
+                get_executor().submit,
+                generate_variants,
+                field_file.storage,
+                field_file.name,
+            )
+        )
+
+
+def variant_urls(field_file):
+    """Map variant names to URLs.
+
+    URLs are derived from the original name without touching the storage,
+    so responses stay cacheable; right after an upload a variant may
+    answer 404 until the worker has written it.
+    """
+    return {
+        variant: field_file.storage.url(variant_name(field_file.name, variant))
+        for variant in IMAGE_VARIANTS
+    }
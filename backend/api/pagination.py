@@ -1,8 +1,162 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from foodgram.constants import MAIN_PAGE_RECORDS_LIMIT
 
 
+def seek(queryset, position, reverse, pk_field="id"):
+    """Order on (created, pk_field) and skip everything up to position."""
+    if reverse:
+        queryset = queryset.order_by("created", pk_field)
+        if position is not None:
+            created, pk = position
+            queryset = queryset.filter(
+                Q(created__gt=created)
+                | Q(created=created, **{f"{pk_field}__gt": pk})
+            )
+    else:
+        queryset = queryset.order_by("-created", f"-{pk_field}")
+        if position is not None:
+            created, pk = position
+            queryset = queryset.filter(
+                Q(created__lt=created)
+                | Q(created=created, **{f"{pk_field}__lt": pk})
+            )
+    return queryset
+
+
 class MainPagePagination(PageNumberPagination):
     page_size_query_param = "limit"
     page_size = MAIN_PAGE_RECORDS_LIMIT
+
+
+class RecipeFeedPagination(MainPagePagination):
+    """Page-number pagination with an opt-in keyset (cursor) mode.
+
+    Passing ?cursor= (empty for the first page) switches to seeking on
+    (created, id), so a page costs the same at any depth and no COUNT(*)
+    is run. The limit/page contract is kept for other clients. Seeking
+    replaces any other ordering, so ranked ?search is rejected in cursor
+    mode rather than silently returned unranked.
+    """
+
+    cursor_query_param = "cursor"
+    cursor_only = False
+    invalid_cursor_message = "Неверный курсор."
+    ranked_query_params = ("search",)
+    ranked_cursor_message = (
+        "Поиск не поддерживается вместе с курсором, используйте page."
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (
+            self.cursor_only
+            or self.cursor_query_param in request.query_params
+        )
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+        if any(
+            request.query_params.get(param)
+            for param in self.ranked_query_params
+        ):
+            raise ValidationError(
+                {self.cursor_query_param: self.ranked_cursor_message}
+            )
+
+        self.request = request
+        self.limit = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        results = self.fetch(queryset, position, reverse, self.limit + 1)
+        has_more = len(results) > self.limit
+        results = results[:self.limit]
+
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def fetch(self, queryset, position, reverse, limit):
+        return list(seek(queryset, position, reverse)[:limit])
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            created = parse_datetime(data["created"])
+            pk = int(data["id"])
+            reverse = bool(data.get("reverse"))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if created is None:
+            raise NotFound(self.invalid_cursor_message)
+
+        return (created, pk), reverse
+
+    def encode_cursor(self, recipe, reverse):
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(
+                {
+                    "created": recipe.created.isoformat(),
+                    "id": recipe.id,
+                    "reverse": reverse,
+                }
+            ).encode()
+        ).decode()
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.use_cursor:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+
+class SubscriptionFeedPagination(RecipeFeedPagination):
+    """Keyset pagination over a recipes.feed.SubscriptionFeed."""
+
+    cursor_only = True
+
+    def fetch(self, feed, position, reverse, limit):
+        return feed.seek(position, reverse, limit)
@@ -0,0 +1,22 @@
+import codecs
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Parse newline-delimited JSON into a list of objects."""
+
+    media_type = "application/x-ndjson"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        reader = codecs.getreader(encoding)(stream)
+
+        try:
+            return [json.loads(line) for line in reader if line.strip()]
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -1,14 +1,15 @@
 from djoser.serializers import UserCreateSerializer
 from rest_framework import serializers
 
-from api.fields import Bit64ImageField
-from users.models import User
+from api.fields import Bit64ImageField, ImageVariantsField
+from users.models import Subscription, User
 
 
 class UserProfileSerializer(UserCreateSerializer):
 
     is_subscribed = serializers.SerializerMethodField()
     avatar = Bit64ImageField(use_url=True)
+    avatar_variants = ImageVariantsField(source="avatar")
 
     class Meta:
         model = User
@@ -20,19 +21,32 @@ class UserProfileSerializer(UserCreateSerializer):
             "last_name",
             "is_subscribed",
             "avatar",
-            "recipes",
-            "recipes_count",
+            "avatar_variants",
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get("request").user
+        return obj.id in self.get_subscribed_author_ids()
 
-        return (
-            user.is_authenticated
-            and user.subscriptions_where_subscriber.filter(
-                author=obj.id
-            ).exists()
-        )
+    def get_subscribed_author_ids(self):
+        """Load the authors followed by the requester once per context.
+
+        Nested and many=True serializers share the root context, so every
+        user in the response is answered from the same set.
+        """
+        if "subscribed_author_ids" not in self.context:
+            request = self.context.get("request")
+            user = getattr(request, "user", None)
+            self.context["subscribed_author_ids"] = (
+                set(
+                    Subscription.objects.filter(subscriber=user)
+                    .order_by()
+                    .values_list("author_id", flat=True)
+                )
+                if user is not None and user.is_authenticated
+                else set()
+            )
+
+        return self.context["subscribed_author_ids"]
 
 
 class CreateUserProfileSerializer(UserProfileSerializer):
@@ -0,0 +1,51 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.cache import bump_content_version, bump_user_version
+from api.images import schedule_variants
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart)
+from users.models import Subscription, User
+
+
+# Saved on every token login; never part of a cached response.
+UNCACHED_USER_FIELDS = frozenset(("last_login",))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=User)
+def invalidate_response_cache(sender, update_fields=None, **kwargs):
+    if (
+        sender is User
+        and update_fields
+        and UNCACHED_USER_FIELDS.issuperset(update_fields)
+    ):
+        return
+    transaction.on_commit(bump_content_version)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_user_recipes(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_user_version, instance.user_id))
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def invalidate_subscriptions(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_user_version, instance.subscriber_id))
+
+
+@receiver(post_save, sender=Recipe)
+def build_recipe_image_variants(sender, instance, **kwargs):
+    schedule_variants(instance.image)
+
+
+@receiver(post_save, sender=User)
+def build_avatar_variants(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "avatar" in update_fields:
+        schedule_variants(instance.avatar)
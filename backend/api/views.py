@@ -1,3 +1,4 @@
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
@@ -7,6 +8,7 @@ from rest_framework.permissions import (IsAuthenticated,
 from rest_framework.response import Response
 
 from api.serializers import UserProfileAvatarSerializer, UserProfileSerializer
+from recipes.models import Recipe
 from users.models import Subscription, User
 from users.serializers import (CreateSubscriptionSerializer,
                                SubscriptionSerializer)
@@ -56,9 +58,10 @@ class UserProfileViewSet(UserViewSet):
     def delete_avatar(self, request):
         user = request.user
         if user.avatar:
-            user.avatar.delete()
+            # The file may be shared with other uploads; clean_media
+            # removes it once nothing references it.
             user.avatar = None
-            user.save()
+            user.save(update_fields=("avatar",))
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -70,17 +73,31 @@ class UserProfileViewSet(UserViewSet):
         url_name="subscriptions",
     )
     def subscriptions(self, request):
-        queryset = User.objects.filter(
-            subscriptions_where_subscriber__author=request.user
-        )
+        queryset = User.objects.filter(followers__subscriber=request.user)
 
         pages = self.paginate_queryset(queryset)
+        self.prefetch_limited_recipes(pages, request)
         serializer = SubscriptionSerializer(
             pages, many=True, context={"request": request}
         )
 
         return self.get_paginated_response(serializer.data)
 
+    @staticmethod
+    def prefetch_limited_recipes(authors, request):
+        recipes = Recipe.objects.all()
+        recipes_limit = request.query_params.get("recipes_limit")
+
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.latest_per_author(
+                [author.id for author in authors], int(recipes_limit)
+            )
+
+        prefetch_related_objects(
+            authors,
+            Prefetch("recipes", queryset=recipes, to_attr="limited_recipes"),
+        )
+
     @action(
         detail=True,
         methods=("post", "delete"),
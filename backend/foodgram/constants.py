@@ -4,12 +4,32 @@ INGREDIENT_NAME_MAX_LENGTH = 128
 INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH = 64
 INGREDIENT_MIN_AMOUNT_IN_RECIPE = 1
 INGREDIENT_INLINE_MIN_AMOUNT = 1
+INGREDIENT_INDEX_TTL = 300
+INGREDIENT_SEARCH_LIMIT = 20
+INGREDIENT_SIMILARITY_THRESHOLD = 0.5
 RECIPE_NAME_MAX_LENGTH = 256
 RECIPE_MIN_COOKING_TIME = 1
 RECIPE_IMAGE_UPLOAD_TO = "recipes/"
+RECIPES_BULK_MAX_ITEMS = 1000
+RECIPE_SEARCH_CONFIG = "russian"
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_BACKFILL_LIMIT = 100
+SIMILAR_RECIPES_LIMIT = 10
+PANTRY_INDEX_TTL = 300
+PANTRY_MAX_INGREDIENTS = 100
+PANTRY_RESULTS_LIMIT = 20
+PANTRY_MAX_RESULTS_LIMIT = 100
+SHORT_LINK_CODE_MAX_LENGTH = 16
+SHORT_LINK_LRU_SIZE = 4096
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24
+SHORT_LINK_RECIPE_URL = "/recipes/{}"
 USER_EMAIL_MAX_LENGTH = 254
 USER_USERNAME_MAX_LENGTH = 150
 USER_USERNAME_REGEX = r"(?!me\b)(^[\w.@+-]+\Z)"
 USER_FIRST_NAME_MAX_LENGTH = 150
 USER_LAST_NAME_MAX_LENGTH = 150
-USER_AVATAR_UPLOAD_TO = "users/"
\ No newline at end of file
+USER_AVATAR_UPLOAD_TO = "users/"
+IMAGE_VARIANTS_DIR = "variants"
+IMAGE_THUMBNAIL_SIZE = (480, 480)
+IMAGE_VARIANTS_QUALITY = 80
@@ -0,0 +1,61 @@
+from django.apps import apps
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+# (model holding the counter, counter field, counted model, foreign key of
+# the counted model pointing to the counter holder).
+COUNTERS = (
+    ("recipes.Recipe", "favorites_count", "recipes.Favorite", "recipe"),
+    (
+        "recipes.Recipe",
+        "shopping_carts_count",
+        "recipes.ShoppingCart",
+        "recipe",
+    ),
+    ("users.User", "recipes_count", "recipes.Recipe", "author"),
+    ("users.User", "subscribers_count", "users.Subscription", "author"),
+)
+
+
+def update_counter(model, pk, field, delta):
+    """Atomically add delta to a counter column, never going below zero."""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def refresh_counter(model, pks, field, counted_model, foreign_key):
+    """Recompute a counter column for the given rows in one statement."""
+    model.objects.filter(pk__in=pks).update(
+        **{field: counted_subquery(counted_model, foreign_key)}
+    )
+
+
+def counted_subquery(counted_model, foreign_key):
+    return Coalesce(
+        Subquery(
+            counted_model.objects.filter(**{foreign_key: OuterRef("pk")})
+            .order_by()
+            .values(foreign_key)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def recount(app_registry=apps):
+    """Repair drifted counters; return {"Model.field": rows fixed}."""
+    fixed = {}
+    for holder, field, counted, foreign_key in COUNTERS:
+        holder = app_registry.get_model(holder)
+        actual = counted_subquery(
+            app_registry.get_model(counted), foreign_key
+        )
+        drifted = holder.objects.annotate(actual=actual).filter(
+            ~Q(**{field: F("actual")})
+        )
+        fixed[f"{holder.__name__}.{field}"] = holder.objects.filter(
+            pk__in=drifted.values("pk")
+        ).update(**{field: actual})
+    return fixed
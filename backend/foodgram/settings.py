@@ -75,6 +75,19 @@ DATABASES = {
     }
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", default="foodgram"),
+    }
+}
+
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", default=60))
+
 AUTH_USER_MODEL = "users.User"
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -110,6 +123,14 @@ STATIC_ROOT = BASE_DIR / "static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+IMAGE_VARIANTS_WORKERS = int(os.getenv("IMAGE_VARIANTS_WORKERS", default=2))
+# One worker applies the refreshes in order, so two of them never patch
+# the same neighbour lists at once.
+SIMILAR_RECIPES_WORKERS = int(
+    os.getenv("SIMILAR_RECIPES_WORKERS", default=1)
+)
+FEED_FANOUT_WORKERS = int(os.getenv("FEED_FANOUT_WORKERS", default=2))
+
 
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
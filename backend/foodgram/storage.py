@@ -0,0 +1,55 @@
+import hashlib
+import os
+from pathlib import PurePosixPath
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from foodgram.constants import IMAGE_VARIANTS_DIR
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Store files under the SHA-256 of their content.
+
+    "recipes/photo.jpg" is saved as "recipes/ab/cd/abcd....jpg", so
+    re-uploading identical bytes reuses the existing file instead of
+    writing a copy. Image variants keep the name they are given, since it
+    is already derived from the hashed original. Files are never deleted
+    on behalf of a model instance: another row may point to the same file.
+    Unreferenced files are removed by the clean_media command.
+    """
+
+    def save(self, name, content, max_length=None):
+        if IMAGE_VARIANTS_DIR not in PurePosixPath(name).parts:
+            name = self.hashed_name(name, content)
+        if self.exists(name):
+            try:
+                # A fresh mtime keeps clean_media --min-age away from a
+                # file that an orphan's re-upload has just reused.
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass
+        return self._save(name, content)
+
+    @staticmethod
+    def hashed_name(name, content):
+        sha256 = hashlib.sha256()
+        if hasattr(content, "seek"):
+            content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+
+        digest = sha256.hexdigest()
+        path = PurePosixPath(name)
+        return str(
+            path.parent
+            / digest[:2]
+            / digest[2:4]
+            / f"{digest}{path.suffix.lower()}"
+        )
+
+
+content_addressed_storage = ContentAddressedStorage()
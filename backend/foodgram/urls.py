@@ -2,14 +2,15 @@ from django.contrib import admin
 from django.urls import include, path
 from django.http import HttpResponse
 
-from recipes.views import RecipeViewSet
+from recipes.views import resolve_legacy_link, resolve_short_link
 
 def home_view(request):
     return HttpResponse("Добро пожаловать на главную страницу!")
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("api.urls", namespace="api")),
-    path("s/<int:pk>", RecipeViewSet.as_view({"get": "retrieve"})),
+    path("s/<int:pk>", resolve_legacy_link, name="legacy-short-link"),
+    path("s/<str:code>", resolve_short_link, name="short-link"),
     path("", home_view, name="home"),
 
 ]
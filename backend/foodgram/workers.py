@@ -0,0 +1,50 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name, max_workers):
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=name
+            )
+        return _executors[name]
+
+
+def run_in_worker(function, *args):
+    close_old_connections()
+    try:
+        function(*args)
+    except Exception:
+        logger.exception("Background task %s failed", function.__name__)
+    finally:
+        connection.close()
+
+
+def submit_on_commit(name, max_workers, function, *args):
+    """Run function(*args) in the named worker pool after the commit.
+
+    SQLite takes one writer at a time, so a worker would fail with
+    "database is locked"; there the function runs inline on commit.
+    """
+    if connection.vendor == "sqlite":
+        transaction.on_commit(partial(function, *args))
+        return
+
+    transaction.on_commit(
+        partial(
+            get_executor(name, max_workers).submit,
+            run_in_worker,
+            function,
+            *args,
+        )
+    )
@@ -1,9 +1,11 @@
 from django.contrib import admin
 from django.contrib.admin import ModelAdmin, register
+from django.utils import timezone
 
 from foodgram.constants import INGREDIENT_INLINE_MIN_AMOUNT
 from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
                             ShoppingCart)
+from recipes.similar import schedule_refresh
 from users.models import Subscription
 
 
@@ -16,37 +18,71 @@ class IngredientAdmin(ModelAdmin):
 class IngredientInRecipeInline(admin.TabularInline):
     model = IngredientInRecipe
     min_num = INGREDIENT_INLINE_MIN_AMOUNT
+    autocomplete_fields = ("ingredient",)
 
 
 @register(Recipe)
 class RecipeAdmin(ModelAdmin):
     list_display = ("pk", "name", "author", "get_favorites", "created")
-    list_filter = ("author", "name")
+    list_select_related = ("author",)
+    list_filter = ("created",)
     search_fields = ("name", "author__username")
+    autocomplete_fields = ("author",)
+    show_full_result_count = False
     inlines = [IngredientInRecipeInline]
 
-    @admin.display(description="Количество добавлений рецепта в избранное")
+    @admin.display(
+        description="Количество добавлений рецепта в избранное",
+        ordering="favorites_count",
+    )
     def get_favorites(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @register(IngredientInRecipe)
-class IngredientInRecipe(ModelAdmin):
+class IngredientInRecipeAdmin(ModelAdmin):
     list_display = ("pk", "recipe", "ingredient", "amount")
+    list_select_related = ("recipe", "ingredient")
+    search_fields = ("recipe__name", "ingredient__name")
+    autocomplete_fields = ("recipe", "ingredient")
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.recipe_changed(obj.recipe_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.recipe_changed(obj.recipe_id)
+
+    @staticmethod
+    def recipe_changed(recipe_id):
+        Recipe.objects.filter(pk=recipe_id).update(updated=timezone.now())
+        schedule_refresh(recipe_id)
 
 
 @register(ShoppingCart)
 class ShoppingCartAdmin(ModelAdmin):
     list_display = ("pk", "user", "recipe")
+    list_select_related = ("user", "recipe")
+    search_fields = ("user__username", "recipe__name")
+    autocomplete_fields = ("user", "recipe")
+    show_full_result_count = False
 
 
 @register(Subscription)
 class SubscriptionAdmin(ModelAdmin):
     list_display = ("pk", "subscriber", "author")
+    list_select_related = ("subscriber", "author")
     search_fields = ("subscriber__username", "author__username")
-    list_filter = ("subscriber", "author")
+    autocomplete_fields = ("subscriber", "author")
+    show_full_result_count = False
 
 
 @register(Favorite)
 class FavoriteAdmin(ModelAdmin):
     list_display = ("pk", "user", "recipe")
+    list_select_related = ("user", "recipe")
+    search_fields = ("user__username", "recipe__name")
+    autocomplete_fields = ("user", "recipe")
+    show_full_result_count = False
@@ -0,0 +1,143 @@
+from functools import partial
+
+from django.db import connection, transaction
+
+from api.cache import bump_content_version
+from api.images import schedule_variants
+from foodgram.counters import refresh_counter, update_counter
+from recipes.feed import schedule_fan_out
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, ShortLink
+from recipes.pantry_index import pantry_index
+from recipes.short_links import encode
+from recipes.similar import schedule_refresh
+from users.models import User
+
+
+def existing_ingredient_ids(items):
+    """Collect ingredient ids of raw recipe payloads and check them at once.
+
+    Malformed entries are skipped here and rejected by the serializer.
+    """
+    ids = set()
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        ingredients = item.get("ingredients")
+        if not isinstance(ingredients, list):
+            continue
+        for ingredient in ingredients:
+            if isinstance(ingredient, dict):
+                try:
+                    ids.add(int(ingredient.get("id")))
+                except (TypeError, ValueError):
+                    pass
+
+    return set(
+        Ingredient.objects.filter(id__in=ids).values_list("id", flat=True)
+    )
+
+
+@transaction.atomic
+def create_recipes(author, validated_items):
+    """Insert recipes and all their ingredients in a few statements.
+
+    bulk_create() sends no signals, so the author counter, the response
+    cache version, the image variants, the followers' feeds, the similar
+    recipes, the pantry index and the short links are handled here.
+    Backends that cannot return ids from a bulk insert (SQLite) save the
+    recipes one by one and let the signals do that work; the ingredients
+    are still inserted with a single statement.
+    """
+    recipes = [
+        Recipe(
+            author=author,
+            **{
+                field: value
+                for field, value in item.items()
+                if field != "ingredients"
+            },
+        )
+        for item in validated_items
+    ]
+
+    if connection.features.can_return_rows_from_bulk_insert:
+        Recipe.objects.bulk_create(recipes)
+        ShortLink.objects.bulk_create(
+            ShortLink(recipe=recipe, code=encode(recipe.id))
+            for recipe in recipes
+        )
+        update_counter(User, author.id, "recipes_count", len(recipes))
+        transaction.on_commit(bump_content_version)
+        for recipe in recipes:
+            schedule_variants(recipe.image)
+            schedule_refresh(recipe.id)
+        schedule_fan_out(author, recipes)
+        transaction.on_commit(
+            partial(
+                pantry_index.update_recipes,
+                [recipe.id for recipe in recipes],
+            )
+        )
+    else:
+        for recipe in recipes:
+            recipe.save()
+
+    IngredientInRecipe.objects.bulk_create(
+        IngredientInRecipe(
+            recipe=recipe,
+            ingredient_id=element["id"],
+            amount=element["amount"],
+        )
+        for recipe, item in zip(recipes, validated_items)
+        for element in item["ingredients"]
+    )
+
+    return recipes
+
+
+@transaction.atomic
+def add_user_recipes(model, user, recipe_ids):
+    """Add recipes to a user's favorites or cart; return {id: outcome}."""
+    found = set(
+        Recipe.objects.filter(pk__in=recipe_ids).values_list("pk", flat=True)
+    )
+    present = set(
+        model.objects.filter(user=user, recipe_id__in=found).values_list(
+            "recipe_id", flat=True
+        )
+    )
+    added = found - present
+
+    model.objects.bulk_create(
+        (model(user=user, recipe_id=recipe_id) for recipe_id in added),
+        ignore_conflicts=True,
+    )
+    # bulk_create() sends no signals; recounting also stays correct when a
+    # concurrent request inserted some of the rows first.
+    refresh_counter(Recipe, added, model.counter_field, model, "recipe")
+
+    return {
+        recipe_id: (
+            "added"
+            if recipe_id in added
+            else "exists" if recipe_id in found else "not_found"
+        )
+        for recipe_id in recipe_ids
+    }
+
+
+@transaction.atomic
+def remove_user_recipes(model, user, recipe_ids):
+    """Remove recipes from a user's favorites or cart; return outcomes."""
+    relations = model.objects.filter(user=user, recipe_id__in=recipe_ids)
+    removed = set(relations.values_list("recipe_id", flat=True))
+
+    # A plain DELETE: QuerySet.delete() would load every row to send
+    # post_delete and update the counters one recipe at a time.
+    relations._raw_delete(relations.db)
+    refresh_counter(Recipe, removed, model.counter_field, model, "recipe")
+
+    return {
+        recipe_id: "removed" if recipe_id in removed else "missing"
+        for recipe_id in recipe_ids
+    }
@@ -0,0 +1,173 @@
+"""Per-user timelines of recipes by the authors they follow.
+
+New recipes are written to the timelines of the author's followers in
+batches (fan-out on write). Authors with more than
+FEED_FANOUT_MAX_FOLLOWERS followers are skipped; their recipes are merged
+in when a feed is read instead (fan-out on read). Fan-out runs in a
+worker pool after the commit. Timeline entries go away with the recipe
+and when the follower unsubscribes.
+"""
+from heapq import merge
+
+from django.conf import settings
+
+from api.pagination import seek
+from foodgram.constants import (FEED_BACKFILL_LIMIT, FEED_FANOUT_BATCH_SIZE,
+                                FEED_FANOUT_MAX_FOLLOWERS)
+from foodgram.workers import submit_on_commit
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription, User
+
+
+def fans_out_on_write(author):
+    return author.subscribers_count <= FEED_FANOUT_MAX_FOLLOWERS
+
+
+def fan_out(author, recipes):
+    """Add the author's new recipes to the timelines of their followers."""
+    if not recipes or not fans_out_on_write(author):
+        return
+
+    followers = (
+        Subscription.objects.filter(author=author)
+        .order_by("subscriber_id")
+        .values_list("subscriber_id", flat=True)
+    )
+    batch_size = max(FEED_FANOUT_BATCH_SIZE // len(recipes), 1)
+    last_id = 0
+    while True:
+        batch = list(followers.filter(subscriber_id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    user_id=user_id,
+                    recipe_id=recipe.id,
+                    author_id=author.id,
+                    created=recipe.created,
+                )
+                for user_id in batch
+                for recipe in recipes
+            ),
+            ignore_conflicts=True,
+        )
+        last_id = batch[-1]
+
+
+def schedule_fan_out(author, recipes):
+    submit_on_commit(
+        "feed-fan-out", settings.FEED_FANOUT_WORKERS, fan_out, author, recipes
+    )
+
+
+def backfill(subscription):
+    """Put the author's latest recipes into a new follower's timeline."""
+    if not fans_out_on_write(subscription.author):
+        return
+
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=subscription.subscriber_id,
+                recipe_id=recipe_id,
+                author_id=subscription.author_id,
+                created=created,
+            )
+            for recipe_id, created in Recipe.objects.filter(
+                author_id=subscription.author_id
+            ).values_list("id", "created")[:FEED_BACKFILL_LIMIT]
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def unfollow(subscription):
+    FeedEntry.objects.filter(
+        user_id=subscription.subscriber_id, author_id=subscription.author_id
+    ).delete()
+
+
+def rebuild():
+    """Refill all timelines from the current subscriptions."""
+    FeedEntry.objects.all().delete()
+    subscriptions = Subscription.objects.filter(
+        author__subscribers_count__lte=FEED_FANOUT_MAX_FOLLOWERS
+    ).order_by("author_id")
+
+    entries = []
+    current_author_id = None
+    for author_id, subscriber_id in subscriptions.values_list(
+        "author_id", "subscriber_id"
+    ):
+        if author_id != current_author_id:
+            current_author_id = author_id
+            recipes = list(
+                Recipe.objects.filter(author_id=author_id)
+                .order_by("-created")
+                .values_list("id", "created")[:FEED_BACKFILL_LIMIT]
+            )
+        entries.extend(
+            FeedEntry(
+                user_id=subscriber_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                created=created,
+            )
+            for recipe_id, created in recipes
+        )
+        if len(entries) >= FEED_FANOUT_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(entries)
+            entries = []
+    FeedEntry.objects.bulk_create(entries)
+
+
+class SubscriptionFeed:
+    """Recipes of the authors a user follows, newest first.
+
+    A page is one range scan of the user's timeline, merged with the
+    recipes of followed authors too popular to fan out on write.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def seek(self, position, reverse, limit):
+        sources = [
+            seek(
+                FeedEntry.objects.filter(user=self.user),
+                position,
+                reverse,
+                pk_field="recipe_id",
+            ).values_list("created", "recipe_id")[:limit]
+        ]
+        popular_authors = list(
+            User.objects.filter(
+                followers__subscriber=self.user,
+                subscribers_count__gt=FEED_FANOUT_MAX_FOLLOWERS,
+            ).values_list("id", flat=True)
+        )
+        if popular_authors:
+            sources.append(
+                seek(
+                    Recipe.objects.filter(author_id__in=popular_authors),
+                    position,
+                    reverse,
+                ).values_list("created", "id")[:limit]
+            )
+
+        ids = []
+        for _, recipe_id in merge(*sources, reverse=not reverse):
+            if recipe_id not in ids:
+                ids.append(recipe_id)
+            if len(ids) == limit:
+                break
+
+        recipes = (
+            Recipe.objects.with_user_flags(self.user)
+            .with_related()
+            .in_bulk(ids)
+        )
+        return [
+            recipes[recipe_id] for recipe_id in ids if recipe_id in recipes
+        ]
@@ -14,6 +14,7 @@ class IngredientFilter(FilterSet):
 
 
 class RecipeFilter(django_filters.FilterSet):
+    search = django_filters.filters.CharFilter(method="search_filter")
     is_favorited = django_filters.filters.BooleanFilter(
         method="is_recipe_in_favorites_filter"
     )
@@ -21,18 +22,21 @@ class RecipeFilter(django_filters.FilterSet):
         method="is_recipe_in_shoppingcart_filter"
     )
 
+    def search_filter(self, queryset, name, value):
+        if value.strip():
+            return queryset.search(value)
+        return queryset
+
     def is_recipe_in_favorites_filter(self, queryset, name, value):
         if value:
-            user = self.request.user
-            return queryset.filter(favorites__user_id=user.id)
+            return queryset.filter(is_favorited=True)
         return queryset
 
     def is_recipe_in_shoppingcart_filter(self, queryset, name, value):
         if value:
-            user = self.request.user
-            return queryset.filter(shopping_recipe__user_id=user.id)
+            return queryset.filter(is_in_shopping_cart=True)
         return queryset
 
     class Meta:
         model = Recipe
-        fields = ("author", "is_favorited", "is_in_shopping_cart")
+        fields = ("author", "is_favorited", "is_in_shopping_cart", "search")
@@ -0,0 +1,155 @@
+import hashlib
+import heapq
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.utils import timezone
+
+from foodgram.constants import (INGREDIENT_INDEX_TTL,
+                                INGREDIENT_SIMILARITY_THRESHOLD)
+from recipes.models import Ingredient
+
+
+def trigrams(text):
+    """Return the pg_trgm-style trigrams of the words of text."""
+    result = set()
+    for word in re.findall(r"\w+", text.casefold()):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class IngredientPrefixIndex:
+    """Process-local index answering ingredient prefix and fuzzy lookups.
+
+    Names are case-folded and kept sorted, so a prefix matches a
+    contiguous slice found by binary search. An inverted index from
+    trigrams to entries serves typo-tolerant search: its cost grows with
+    the postings of the query's trigrams, not with the catalogue. Every
+    entry keeps its pre-rendered JSON object, ready to be joined into a
+    response body. Saving or deleting an Ingredient invalidates the index
+    of the current process; other processes pick the change up after
+    INGREDIENT_INDEX_TTL seconds. Each build also yields HTTP validators:
+    a digest of the served catalogue and the time this process first
+    served it.
+    """
+
+    def __init__(self, ttl=INGREDIENT_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index = None
+        self._built_at = 0
+        self._digest = None
+        self._changed_at = None
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+    def build(self):
+        entries = sorted(
+            (name.casefold(), name, ingredient_id, measurement_unit)
+            for ingredient_id, name, measurement_unit in (
+                Ingredient.objects.order_by().values_list(
+                    "id", "name", "measurement_unit"
+                )
+            )
+        )
+        keys = [entry[0] for entry in entries]
+        fragments = [
+            json.dumps(
+                {
+                    "id": ingredient_id,
+                    "name": name,
+                    "measurement_unit": measurement_unit,
+                },
+                ensure_ascii=False,
+            )
+            for _, name, ingredient_id, measurement_unit in entries
+        ]
+        postings = defaultdict(list)
+        sizes = []
+        for position, (_, name, *_) in enumerate(entries):
+            name_trigrams = trigrams(name)
+            sizes.append(len(name_trigrams))
+            for trigram in name_trigrams:
+                postings[trigram].append(position)
+        return keys, fragments, dict(postings), sizes
+
+    def _snapshot(self):
+        with self._lock:
+            expired = time.monotonic() - self._built_at > self.ttl
+            if self._index is None or expired:
+                self._index = self.build()
+                self._built_at = time.monotonic()
+                digest = hashlib.md5(
+                    "\n".join(self._index[1]).encode(), usedforsecurity=False
+                ).hexdigest()
+                if digest != self._digest:
+                    self._digest = digest
+                    self._changed_at = timezone.now()
+            return self._index
+
+    def validators(self):
+        """Return the catalogue digest and when it last changed."""
+        self._snapshot()
+        with self._lock:
+            return self._digest, self._changed_at
+
+    def search(self, prefix="", limit=None):
+        """Return JSON fragments of the ingredients starting with prefix.
+
+        Matches follow the API ordering of Ingredient (name descending).
+        """
+        keys, fragments, _, _ = self._snapshot()
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        stop = bisect_left(keys, prefix + "\U0010ffff", lo=start)
+
+        if limit is not None:
+            start = max(start, stop - limit)
+
+        return fragments[start:stop][::-1]
+
+    def search_json(self, prefix="", limit=None):
+        return "[" + ",".join(self.search(prefix, limit)) + "]"
+
+    def similar(self, query, limit):
+        """Return JSON fragments of the ingredients most similar to query.
+
+        Like pg_trgm word similarity, an entry matches when it contains
+        enough of the query's trigrams; ties go to the closer whole name.
+        """
+        _, fragments, postings, sizes = self._snapshot()
+        query_trigrams = trigrams(query)
+        if not query_trigrams:
+            return []
+
+        hits = Counter()
+        for trigram in query_trigrams:
+            hits.update(postings.get(trigram, ()))
+
+        total = len(query_trigrams)
+        ranked = heapq.nlargest(
+            limit,
+            (
+                (
+                    count / total,
+                    count / (total + sizes[position] - count),
+                    position,
+                )
+                for position, count in hits.items()
+                if count / total >= INGREDIENT_SIMILARITY_THRESHOLD
+            ),
+        )
+        return [fragments[position] for _, _, position in ranked]
+
+    def similar_json(self, query, limit):
+        return "[" + ",".join(self.similar(query, limit)) + "]"
+
+
+ingredient_index = IngredientPrefixIndex()
@@ -0,0 +1,98 @@
+import os
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from api.images import IMAGE_VARIANTS, variant_name
+from foodgram.constants import RECIPE_IMAGE_UPLOAD_TO, USER_AVATAR_UPLOAD_TO
+from foodgram.storage import content_addressed_storage
+from recipes.models import Recipe
+from users.models import User
+
+DEFAULT_MIN_AGE = 60 * 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет из MEDIA_ROOT изображения рецептов и аватары (вместе с их "
+        "вариантами), на которые не ссылается ни одна запись."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--min-age",
+            type=int,
+            default=DEFAULT_MIN_AGE,
+            help=(
+                "Не трогать файлы моложе указанного числа секунд: они могут "
+                "принадлежать ещё не завершённой загрузке."
+            ),
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только показать, что будет удалено.",
+        )
+
+    def handle(self, *args, min_age, dry_run, **options):
+        root = Path(content_addressed_storage.location)
+        deadline = time.time() - min_age
+        referenced = self.referenced_names()
+
+        candidates = []
+        for upload_to in (RECIPE_IMAGE_UPLOAD_TO, USER_AVATAR_UPLOAD_TO):
+            for dirpath, _, filenames in os.walk(root / upload_to):
+                for filename in filenames:
+                    path = Path(dirpath) / filename
+                    name = path.relative_to(root).as_posix()
+                    if name not in referenced:
+                        candidates.append((path, name))
+
+        # Uploads may have reused an orphan while the tree was walked: look
+        # the references up again and check every file's age just before
+        # it goes.
+        referenced = self.referenced_names()
+        removed = freed = 0
+        for path, name in candidates:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if name in referenced or stat.st_mtime > deadline:
+                continue
+            removed += 1
+            freed += stat.st_size
+            if dry_run:
+                self.stdout.write(name)
+            else:
+                content_addressed_storage.delete(name)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{'Будет удалено' if dry_run else 'Удалено'} файлов: "
+                f"{removed}, {freed} байт."
+            )
+        )
+
+    def referenced_names(self):
+        referenced = set()
+        for name in self.stored_names():
+            referenced.add(name)
+            referenced.update(
+                variant_name(name, variant) for variant in IMAGE_VARIANTS
+            )
+        return referenced
+
+    @staticmethod
+    def stored_names():
+        yield from (
+            Recipe.objects.exclude(image="")
+            .values_list("image", flat=True)
+            .iterator()
+        )
+        yield from (
+            User.objects.exclude(avatar="")
+            .values_list("avatar", flat=True)
+            .iterator()
+        )
@@ -0,0 +1,168 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import Ingredient
+
+DEFAULT_PATH = Path(settings.BASE_DIR).parent / "data" / "ingredients.csv"
+DEFAULT_BATCH_SIZE = 1000
+JSON_READ_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            name, measurement_unit = row
+            yield name.strip(), measurement_unit.strip()
+
+
+def read_json(file):
+    """Yield objects of a top-level JSON array without loading it whole."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_READ_CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        raise CommandError("Ожидается JSON-массив ингредиентов.")
+    buffer = buffer[1:]
+
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_READ_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError("Некорректный JSON-файл ингредиентов.")
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield item["name"].strip(), item["measurement_unit"].strip()
+
+
+READERS = {
+    ".csv": read_csv,
+    ".json": read_json,
+}
+
+
+class RowStream:
+    """File-like view over rows, consumed by COPY FROM STDIN."""
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = ""
+        self.count = 0
+
+    @staticmethod
+    def escape(value):
+        return (
+            value.replace("\\", "\\\\")
+            .replace("\t", "\\t")
+            .replace("\n", "\\n")
+            .replace("\r", "\\r")
+        )
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.count += 1
+            self.buffer += "\t".join(map(self.escape, row)) + "\n"
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает ингредиенты из CSV (name,measurement_unit) или "
+        "JSON-файла. Уже существующие ингредиенты пропускаются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default=str(DEFAULT_PATH),
+            help="Путь к ingredients.csv или ingredients.json.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Размер пачки для bulk_create.",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Не использовать COPY даже на PostgreSQL.",
+        )
+
+    def handle(self, *args, path, batch_size, no_copy, **options):
+        path = Path(path)
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError(f"Неподдерживаемый формат файла: {path}")
+        if not path.exists():
+            raise CommandError(f"Файл не найден: {path}")
+
+        with open(path, encoding="utf-8", newline="") as file:
+            rows = reader(file)
+            with transaction.atomic():
+                if connection.vendor == "postgresql" and not no_copy:
+                    total, inserted = self.copy_rows(rows)
+                else:
+                    total, inserted = self.bulk_create_rows(rows, batch_size)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Добавлено ингредиентов: {inserted}, "
+                f"пропущено: {total - inserted}."
+            )
+        )
+
+    def bulk_create_rows(self, rows, batch_size):
+        count_before = Ingredient.objects.count()
+        total = 0
+        while True:
+            batch = [
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in islice(rows, batch_size)
+            ]
+            if not batch:
+                break
+            total += len(batch)
+            Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+
+        return total, Ingredient.objects.count() - count_before
+
+    def copy_rows(self, rows):
+        table = Ingredient._meta.db_table
+        stream = RowStream(rows)
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE ingredient_import "
+                "(name text, measurement_unit text) ON COMMIT DROP"
+            )
+            cursor.cursor.copy_expert(
+                "COPY ingredient_import (name, measurement_unit) FROM STDIN",
+                stream,
+            )
+            cursor.execute(
+                f"INSERT INTO {table} (name, measurement_unit) "
+                "SELECT DISTINCT name, measurement_unit "
+                "FROM ingredient_import "
+                "ON CONFLICT ON CONSTRAINT unique_ingredient DO NOTHING"
+            )
+            inserted = cursor.rowcount
+
+        return stream.count, inserted
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild
+
+
+class Command(BaseCommand):
+    help = "Заново заполняет ленты подписок из текущих подписок."
+
+    def handle(self, *args, **options):
+        rebuild()
+        self.stdout.write("Ленты подписок перестроены.")
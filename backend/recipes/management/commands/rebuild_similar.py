@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similar import rebuild
+
+
+class Command(BaseCommand):
+    help = "Заново рассчитывает похожие рецепты для всех рецептов."
+
+    def handle(self, *args, **options):
+        rebuild()
+        self.stdout.write("Похожие рецепты пересчитаны.")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from foodgram.counters import recount
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счётчики избранного, списков покупок, рецептов "
+        "и подписчиков и исправляет расхождения."
+    )
+
+    def handle(self, *args, **options):
+        for counter, fixed in recount().items():
+            self.stdout.write(f"{counter}: исправлено записей: {fixed}")
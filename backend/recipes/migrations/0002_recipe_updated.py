@@ -0,0 +1,20 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="updated",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата изменения рецепта"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:45
+
+from django.db import migrations, models
+import foodgram.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_recipe_updated"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                storage=foodgram.storage.ContentAddressedStorage(),
+                upload_to="recipes/",
+                verbose_name="Фотография рецепта",
+            ),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(model, foreign_key):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{foreign_key: OuterRef("pk")})
+            .order_by()
+            .values(foreign_key)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Favorite = apps.get_model("recipes", "Favorite")
+    ShoppingCart = apps.get_model("recipes", "ShoppingCart")
+    User = apps.get_model("users", "User")
+    Subscription = apps.get_model("users", "Subscription")
+
+    Recipe.objects.update(
+        favorites_count=count_of(Favorite, "recipe"),
+        shopping_carts_count=count_of(ShoppingCart, "recipe"),
+    )
+    User.objects.update(
+        recipes_count=count_of(Recipe, "author"),
+        subscribers_count=count_of(Subscription, "author"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_recipe_image_storage"),
+        ("users", "0003_user_counters"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="favorites_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Количество добавлений в избранное",
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="shopping_carts_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                verbose_name="Количество добавлений в список покупок",
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
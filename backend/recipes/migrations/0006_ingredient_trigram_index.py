@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from recipes.search import create_trigram_index, drop_trigram_index
+
+
+def create_index(apps, schema_editor):
+    create_trigram_index(schema_editor.connection)
+
+
+def drop_index(apps, schema_editor):
+    drop_trigram_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_recipe_search"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,127 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# The feed limits as of this migration.
+FANOUT_MAX_FOLLOWERS = 10000
+BACKFILL_LIMIT = 100
+BATCH_SIZE = 1000
+
+
+def fill_feed(apps, schema_editor):
+    FeedEntry = apps.get_model("recipes", "FeedEntry")
+    Recipe = apps.get_model("recipes", "Recipe")
+    Subscription = apps.get_model("users", "Subscription")
+
+    subscriptions = Subscription.objects.filter(
+        author__subscribers_count__lte=FANOUT_MAX_FOLLOWERS
+    ).order_by("author_id")
+
+    entries = []
+    current_author_id = None
+    for author_id, subscriber_id in subscriptions.values_list(
+        "author_id", "subscriber_id"
+    ):
+        if author_id != current_author_id:
+            current_author_id = author_id
+            recipes = list(
+                Recipe.objects.filter(author_id=author_id)
+                .order_by("-created")
+                .values_list("id", "created")[:BACKFILL_LIMIT]
+            )
+        entries.extend(
+            FeedEntry(
+                user_id=subscriber_id,
+                recipe_id=recipe_id,
+                author_id=author_id,
+                created=created,
+            )
+            for recipe_id, created in recipes
+        )
+        if len(entries) >= BATCH_SIZE:
+            FeedEntry.objects.bulk_create(entries)
+            entries = []
+    FeedEntry.objects.bulk_create(entries)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0006_ingredient_trigram_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    models.DateTimeField(verbose_name="Дата создания рецепта"),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор рецепта",
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Подписчик",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Запись ленты",
+                "verbose_name_plural": "Записи ленты",
+                "ordering": ("-created", "-recipe"),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="feedentry",
+            index=models.Index(
+                fields=["user", "-created", "-recipe"],
+                name="feed_entry_timeline_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feedentry",
+            index=models.Index(
+                fields=["user", "author"], name="feed_entry_author_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="feedentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_feed_entry"
+            ),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
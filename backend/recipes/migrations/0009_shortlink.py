@@ -0,0 +1,73 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from recipes.short_links import encode
+
+BATCH_SIZE = 1000
+
+
+def create_short_links(apps, schema_editor):
+    recipe_model = apps.get_model("recipes", "Recipe")
+    short_link_model = apps.get_model("recipes", "ShortLink")
+
+    recipe_ids = list(
+        recipe_model.objects.filter(short_link__isnull=True).values_list(
+            "id", flat=True
+        )
+    )
+    short_link_model.objects.bulk_create(
+        (
+            short_link_model(recipe_id=recipe_id, code=encode(recipe_id))
+            for recipe_id in recipe_ids
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_similarrecipe"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShortLink",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "code",
+                    models.CharField(
+                        max_length=16,
+                        unique=True,
+                        verbose_name="Код короткой ссылки",
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="short_link",
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Короткая ссылка",
+                "verbose_name_plural": "Короткие ссылки",
+                "ordering": ("-recipe",),
+            },
+        ),
+        migrations.RunPython(create_short_links, migrations.RunPython.noop),
+    ]
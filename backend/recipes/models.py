@@ -1,17 +1,48 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 
 from foodgram.constants import (INGREDIENT_MEASUREMENT_UNIT_MAX_LENGTH,
                                 INGREDIENT_MIN_AMOUNT_IN_RECIPE,
                                 INGREDIENT_NAME_MAX_LENGTH,
                                 RECIPE_IMAGE_UPLOAD_TO,
                                 RECIPE_MIN_COOKING_TIME,
-                                RECIPE_NAME_MAX_LENGTH)
+                                RECIPE_NAME_MAX_LENGTH, RECIPE_SEARCH_CONFIG,
+                                SHORT_LINK_CODE_MAX_LENGTH)
+from foodgram.counters import update_counter
+from foodgram.storage import content_addressed_storage
+from recipes.search import (FTS_TABLE, INGREDIENT_TABLE, RECIPE_TABLE,
+                            SEARCH_VECTOR_COLUMN, fts_query)
 
 User = get_user_model()
 
 
+class IngredientQuerySet(models.QuerySet):
+
+    def similar_to(self, query):
+        """Rank ingredients by pg_trgm word similarity to the query.
+
+        PostgreSQL only: the <% operator is served by the trigram index
+        from migration 0006 and honours pg_trgm.word_similarity_threshold.
+        """
+        name = f'"{INGREDIENT_TABLE}"."name"'
+        return (
+            self.filter(
+                RawSQL(f"%s <%% {name}", (query,), models.BooleanField())
+            )
+            .annotate(
+                similarity=RawSQL(
+                    f"word_similarity(%s, {name})",
+                    (query,),
+                    models.FloatField(),
+                )
+            )
+            .order_by("-similarity", "name")
+        )
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         max_length=INGREDIENT_NAME_MAX_LENGTH,
@@ -22,6 +53,8 @@ class Ingredient(models.Model):
         verbose_name="Единицы измерения",
     )
 
+    objects = IngredientQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
@@ -71,6 +104,125 @@ class IngredientInRecipe(models.Model):
         return f"{self.ingredient} {self.recipe}"
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        """Annotate the per-user flags read by RecipeSerializer."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+                is_in_shopping_cart=models.Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+
+        return self.annotate(
+            is_favorited=models.Exists(
+                Favorite.objects.filter(
+                    user=user, recipe=models.OuterRef("pk")
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=models.OuterRef("pk")
+                )
+            ),
+        )
+
+    def latest_per_author(self, author_ids, limit):
+        """Keep the newest `limit` recipes of each author in one query.
+
+        ROW_NUMBER() cannot be filtered on directly, so the ranked query is
+        wrapped in a subquery; this runs on both SQLite and PostgreSQL.
+        """
+        if not author_ids:
+            # An empty IN () cannot be compiled into the raw subquery.
+            return self.none()
+
+        ranked = (
+            self.filter(author_id__in=author_ids)
+            .annotate(
+                row_number=models.Window(
+                    expression=RowNumber(),
+                    partition_by=models.F("author_id"),
+                    order_by=models.F("created").desc(),
+                )
+            )
+            .order_by()
+            .values("pk", "row_number")
+        )
+        sql, params = ranked.query.sql_with_params()
+
+        return self.filter(
+            pk__in=RawSQL(
+                f'SELECT "id" FROM ({sql}) ranked WHERE "row_number" <= %s',
+                (*params, limit),
+            )
+        )
+
+    def search(self, query):
+        """Keep recipes matching every word, best first, as search_rank.
+
+        Uses the index from recipes.search: the GIN-indexed tsvector on
+        PostgreSQL, FTS5 on SQLite, plain icontains without ranking
+        elsewhere.
+        """
+        vendor = connections[self.db].vendor
+        if vendor == "postgresql":
+            vector = f'"{RECIPE_TABLE}"."{SEARCH_VECTOR_COLUMN}"'
+            tsquery = "websearch_to_tsquery(%s::regconfig, %s)"
+            params = (RECIPE_SEARCH_CONFIG, query)
+            match = RawSQL(
+                f"{vector} @@ {tsquery}", params, models.BooleanField()
+            )
+            rank = RawSQL(
+                f"ts_rank({vector}, {tsquery})", params, models.FloatField()
+            )
+        elif vendor == "sqlite":
+            params = (fts_query(query),)
+            match = models.Q(
+                pk__in=RawSQL(
+                    f"SELECT rowid FROM {FTS_TABLE} "
+                    f"WHERE {FTS_TABLE} MATCH %s",
+                    params,
+                )
+            )
+            # bm25() is lower for better matches; names weigh more.
+            rank = RawSQL(
+                f"SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s "
+                f'AND rowid = "{RECIPE_TABLE}"."id"',
+                params,
+                models.FloatField(),
+            )
+        else:
+            match = models.Q()
+            for word in query.split():
+                match &= models.Q(name__icontains=word) | models.Q(
+                    text__icontains=word
+                )
+            rank = models.Value(0.0, output_field=models.FloatField())
+
+        return (
+            self.filter(match)
+            .annotate(search_rank=rank)
+            .order_by("-search_rank", *Recipe._meta.ordering)
+        )
+
+    def with_related(self):
+        """Load the author and ingredients in a constant number of queries."""
+        return self.select_related("author").prefetch_related(
+            models.Prefetch(
+                "ingredients_in_recipe",
+                queryset=IngredientInRecipe.objects.select_related(
+                    "ingredient"
+                ).order_by("pk"),
+            )
+        )
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -83,6 +235,7 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name="Фотография рецепта",
         upload_to=RECIPE_IMAGE_UPLOAD_TO,
+        storage=content_addressed_storage,
         blank=True,
     )
     text = models.TextField(verbose_name="Описание рецепта")
@@ -102,6 +255,22 @@ class Recipe(models.Model):
         db_index=True,
         verbose_name="Дата публикации рецепта",
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Дата изменения рецепта",
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество добавлений в избранное",
+    )
+    shopping_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество добавлений в список покупок",
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Рецепт"
@@ -113,6 +282,42 @@ class Recipe(models.Model):
         return self.name
 
 
+class UserRecipeRelationQuerySet(models.QuerySet):
+    """Single-statement, race-free adds and removes of user's recipes.
+
+    They send no signals, so the recipe counter is updated here.
+    """
+
+    @transaction.atomic
+    def add(self, user, recipe_id):
+        """Insert the relation unless it exists; return whether it did."""
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        meta = self.model._meta
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote_name(meta.db_table)} "
+                f"({quote_name(meta.get_field('user').column)}, "
+                f"{quote_name(meta.get_field('recipe').column)}) "
+                "VALUES (%s, %s) ON CONFLICT DO NOTHING",
+                (user.pk, recipe_id),
+            )
+            added = cursor.rowcount == 1
+        if added:
+            update_counter(Recipe, recipe_id, self.model.counter_field, 1)
+        return added
+
+    @transaction.atomic
+    def remove(self, user, recipe_id):
+        """Delete the relation; return whether there was one."""
+        removed = bool(
+            self.filter(user=user, recipe_id=recipe_id)._raw_delete(self.db)
+        )
+        if removed:
+            update_counter(Recipe, recipe_id, self.model.counter_field, -1)
+        return removed
+
+
 class UserRecipeRelation(models.Model):
     user = models.ForeignKey(
         User,
@@ -125,6 +330,8 @@ class UserRecipeRelation(models.Model):
         verbose_name="Рецепт",
     )
 
+    objects = UserRecipeRelationQuerySet.as_manager()
+
     class Meta:
         abstract = True
         constraints = [
@@ -139,6 +346,7 @@ class UserRecipeRelation(models.Model):
 
 
 class Favorite(UserRecipeRelation):
+    counter_field = "favorites_count"
 
     class Meta(UserRecipeRelation.Meta):
         verbose_name = "Избранное"
@@ -147,8 +355,113 @@ class Favorite(UserRecipeRelation):
 
 
 class ShoppingCart(UserRecipeRelation):
+    counter_field = "shopping_carts_count"
 
     class Meta(UserRecipeRelation.Meta):
         verbose_name = "Список покупок"
         verbose_name_plural = "Списки покупок"
         default_related_name = "shopping_carts"
+
+
+class FeedEntry(models.Model):
+    """A recipe in the timeline of a follower of its author."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Подписчик",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор рецепта",
+    )
+    created = models.DateTimeField(verbose_name="Дата создания рецепта")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"], name="unique_feed_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-created", "-recipe"],
+                name="feed_entry_timeline_idx",
+            ),
+            models.Index(
+                fields=["user", "author"], name="feed_entry_author_idx"
+            ),
+        ]
+        ordering = ("-created", "-recipe")
+
+    def __str__(self):
+        return f"{self.user} {self.recipe}"
+
+
+class SimilarRecipe(models.Model):
+    """A precomputed neighbour of a recipe by ingredient overlap."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similar_recipes",
+        verbose_name="Рецепт",
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="similar_of",
+        verbose_name="Похожий рецепт",
+    )
+    score = models.FloatField(verbose_name="Сходство")
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "similar"], name="unique_similar_recipe"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["recipe", "-score"], name="similar_recipe_score_idx"
+            ),
+        ]
+        ordering = ("-score",)
+
+    def __str__(self):
+        return f"{self.recipe} ~ {self.similar}"
+
+
+class ShortLink(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="short_link",
+        verbose_name="Рецепт",
+    )
+    code = models.CharField(
+        max_length=SHORT_LINK_CODE_MAX_LENGTH,
+        unique=True,
+        verbose_name="Код короткой ссылки",
+    )
+
+    class Meta:
+        verbose_name = "Короткая ссылка"
+        verbose_name_plural = "Короткие ссылки"
+        ordering = ("-recipe",)
+
+    def __str__(self):
+        return self.code
@@ -0,0 +1,121 @@
+"""Database search indexes.
+
+Recipes: PostgreSQL keeps a generated tsvector column with a GIN index
+on the recipes table, SQLite an FTS5 external-content table kept in sync
+by triggers. RecipeQuerySet.search() queries whichever one exists.
+
+Ingredients: PostgreSQL gets a pg_trgm GIN index on the name, used by
+IngredientQuerySet.similar_to(); other backends use the in-process
+trigram index of recipes.ingredient_index instead.
+"""
+from foodgram.constants import RECIPE_SEARCH_CONFIG
+
+RECIPE_TABLE = "recipes_recipe"
+INGREDIENT_TABLE = "recipes_ingredient"
+INGREDIENT_TRIGRAM_INDEX = "recipes_ingredient_name_trgm_idx"
+SEARCH_VECTOR_COLUMN = "search_vector"
+SEARCH_VECTOR_INDEX = "recipes_recipe_search_vector_idx"
+FTS_TABLE = "recipes_recipe_fts"
+
+POSTGRESQL_CREATE = (
+    f"ALTER TABLE {RECIPE_TABLE} "
+    f"ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector "
+    "GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{RECIPE_SEARCH_CONFIG}', name), 'A') || "
+    f"setweight(to_tsvector('{RECIPE_SEARCH_CONFIG}', text), 'B')"
+    ") STORED",
+    f"CREATE INDEX IF NOT EXISTS {SEARCH_VECTOR_INDEX} "
+    f"ON {RECIPE_TABLE} USING GIN ({SEARCH_VECTOR_COLUMN})",
+)
+POSTGRESQL_DROP = (
+    f"DROP INDEX IF EXISTS {SEARCH_VECTOR_INDEX}",
+    f"ALTER TABLE {RECIPE_TABLE} DROP COLUMN IF EXISTS {SEARCH_VECTOR_COLUMN}",
+)
+
+SQLITE_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert "
+    f"AFTER INSERT ON {RECIPE_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+    "VALUES (new.id, new.name, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete "
+    f"AFTER DELETE ON {RECIPE_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text) "
+    "VALUES ('delete', old.id, old.name, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update "
+    f"AFTER UPDATE OF name, text ON {RECIPE_TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text) "
+    "VALUES ('delete', old.id, old.name, old.text); "
+    f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+    "VALUES (new.id, new.name, new.text); END",
+)
+SQLITE_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"name, text, content='{RECIPE_TABLE}', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    *SQLITE_TRIGGERS,
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')",
+)
+SQLITE_DROP = (
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+)
+
+TRIGRAM_CREATE = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS {INGREDIENT_TRIGRAM_INDEX} "
+    f"ON {INGREDIENT_TABLE} USING GIN (name gin_trgm_ops)",
+)
+TRIGRAM_DROP = (f"DROP INDEX IF EXISTS {INGREDIENT_TRIGRAM_INDEX}",)
+
+STATEMENTS = {
+    "postgresql": (POSTGRESQL_CREATE, POSTGRESQL_DROP),
+    "sqlite": (SQLITE_CREATE, SQLITE_DROP),
+}
+
+
+def execute(connection, statements):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def create_search_index(connection):
+    create, _ = STATEMENTS.get(connection.vendor, ((), ()))
+    execute(connection, create)
+
+
+def drop_search_index(connection):
+    _, drop = STATEMENTS.get(connection.vendor, ((), ()))
+    execute(connection, drop)
+
+
+def create_trigram_index(connection):
+    if connection.vendor == "postgresql":
+        execute(connection, TRIGRAM_CREATE)
+
+
+def drop_trigram_index(connection):
+    if connection.vendor == "postgresql":
+        execute(connection, TRIGRAM_DROP)
+
+
+def repair_search_index(connection):
+    """Restore the SQLite triggers and resync the FTS table.
+
+    SQLite migrations that alter recipes_recipe rebuild the table and
+    silently drop its triggers, so this runs after every migrate.
+    """
+    if (
+        connection.vendor == "sqlite"
+        and FTS_TABLE in connection.introspection.table_names()
+    ):
+        execute(connection, SQLITE_CREATE)
+
+
+def fts_query(query):
+    """Turn user input into an FTS5 query matching every word."""
+    return " ".join(
+        '"{}"'.format(word.replace('"', '""')) for word in query.split()
+    )
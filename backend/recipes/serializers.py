@@ -1,10 +1,13 @@
+from django.db import transaction
 from rest_framework import serializers
 
-from api.fields import Bit64ImageField
+from api.fields import Bit64ImageField, ImageVariantsField
 from api.serializers import UserProfileSerializer
-from foodgram.constants import INGREDIENT_MIN_AMOUNT_IN_RECIPE
-from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart)
+from foodgram.constants import (INGREDIENT_MIN_AMOUNT_IN_RECIPE,
+                                PANTRY_MAX_INGREDIENTS,
+                                PANTRY_MAX_RESULTS_LIMIT,
+                                PANTRY_RESULTS_LIMIT, RECIPES_BULK_MAX_ITEMS)
+from recipes.models import Ingredient, IngredientInRecipe, Recipe
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -39,6 +42,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(source="image")
 
     class Meta:
         model = Recipe
@@ -50,26 +54,36 @@ class RecipeSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         )
 
     def get_is_favorited(self, obj):
-        request = self.context.get("request")
+        return self.get_user_recipe_flag(obj, "is_favorited", "favorites")
 
-        return (
-            request is not None
-            and request.user.is_authenticated
-            and request.user.favorites.filter(pk=obj.id).exists()
+    def get_is_in_shopping_cart(self, obj):
+        return self.get_user_recipe_flag(
+            obj, "is_in_shopping_cart", "shopping_carts"
         )
 
-    def get_is_in_shopping_cart(self, obj):
+    def get_user_recipe_flag(self, obj, annotation, related_name):
+        """Read the flag annotated by RecipeQuerySet.with_user_flags.
+
+        Recipes that were not loaded through the annotated queryset
+        (e.g. just created) fall back to a single exists() query.
+        """
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation)
+
         request = self.context.get("request")
 
         return (
             request is not None
             and request.user.is_authenticated
-            and request.user.shopping_carts.filter(pk=obj.id).exists()
+            and getattr(request.user, related_name).filter(
+                recipe=obj
+            ).exists()
         )
 
 
@@ -81,14 +95,6 @@ class CreateShortIngredientsSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ("id", "amount")
 
-    def validate_id(self, ingredient_id):
-        if not Ingredient.objects.filter(id=ingredient_id).exists():
-            raise serializers.ValidationError(
-                f"Ингредиента с id {ingredient_id} не существует."
-            )
-
-        return ingredient_id
-
     def validate_amount(self, value):
         if value < INGREDIENT_MIN_AMOUNT_IN_RECIPE:
             raise serializers.ValidationError(
@@ -115,9 +121,13 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         )
 
     def to_representation(self, instance):
-        serializer = RecipeSerializer(
-            instance, context={"request": self.context.get("request")}
+        request = self.context.get("request")
+        instance = (
+            Recipe.objects.with_user_flags(request.user)
+            .with_related()
+            .get(pk=instance.pk)
         )
+        serializer = RecipeSerializer(instance, context={"request": request})
         return serializer.data
 
     def validate(self, data):
@@ -134,8 +144,23 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
                 "Ингредиенты должны быть уникальными!"
             )
 
+        existing = self.context.get("existing_ingredient_ids")
+        if existing is None:
+            existing = Ingredient.objects.in_bulk(ingredients_ids)
+        missing = [pk for pk in ingredients_ids if pk not in existing]
+        if missing:
+            raise serializers.ValidationError(
+                {
+                    "ingredients": (
+                        "Ингредиентов с id "
+                        f"{', '.join(map(str, missing))} не существует."
+                    )
+                }
+            )
+
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop("ingredients")
 
@@ -145,10 +170,9 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        IngredientInRecipe.objects.filter(recipe=instance).delete()
-
-        self.create_ingredients(validated_data.pop("ingredients"), instance)
+        self.update_ingredients(validated_data.pop("ingredients"), instance)
 
         return super().update(instance, validated_data)
 
@@ -157,61 +181,81 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             IngredientInRecipe(
                 ingredient_id=element["id"],
                 recipe=recipe,
-                amount = element["amount"]
+                amount=element["amount"],
             )
             for element in ingredients
         )
 
+    def update_ingredients(self, ingredients, recipe):
+        """Apply only the inserts, amount changes and deletes that differ."""
+        amounts = {element["id"]: element["amount"] for element in ingredients}
+        current = {
+            row.ingredient_id: row
+            for row in IngredientInRecipe.objects.filter(
+                recipe=recipe
+            ).order_by()
+        }
+
+        removed = current.keys() - amounts.keys()
+        if removed:
+            IngredientInRecipe.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+
+        changed = []
+        for ingredient_id, row in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ("amount",))
+
+        self.create_ingredients(
+            (
+                element
+                for element in ingredients
+                if element["id"] not in current
+            ),
+            recipe,
+        )
+
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField(source="image")
 
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "image_variants", "cooking_time")
 
 
-class UserRecipeRelationSerializer(serializers.Serializer):
+class PantryRecipeSerializer(ShortRecipeSerializer):
+    matched = serializers.IntegerField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
 
-    class Meta:
-        fields = ("user", "recipe")
-
-    def to_representation(self, instance):
-        serializer = ShortRecipeSerializer(
-            instance.recipe,
-            context=self.context
-        )
-        return serializer.data
+    class Meta(ShortRecipeSerializer.Meta):
+        fields = ShortRecipeSerializer.Meta.fields + ("matched", "missing")
 
-    def validate(self, data, related_name):
-        user = data.get("user")
-        recipe = data.get("recipe")
-
-        if getattr(user, related_name).filter(recipe__id=recipe.id).exists():
-            raise serializers.ValidationError(
-                f"{related_name} пользователя {user.username} "
-                f"уже содержит рецепт {recipe.name}."
-            )
-
-        return data
-
-
-class FavoriteSerializer(
-    UserRecipeRelationSerializer, serializers.ModelSerializer
-):
-
-    class Meta(UserRecipeRelationSerializer.Meta):
-        model = Favorite
-
-    def validate(self, data):
-        return super().validate(data, "favorites")
 
+class PantryQuerySerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=PANTRY_MAX_INGREDIENTS,
+    )
+    limit = serializers.IntegerField(
+        min_value=1,
+        max_value=PANTRY_MAX_RESULTS_LIMIT,
+        default=PANTRY_RESULTS_LIMIT,
+    )
 
-class ShoppingCartSerializer(
-    UserRecipeRelationSerializer, serializers.ModelSerializer
-):
 
-    class Meta(UserRecipeRelationSerializer.Meta):
-        model = ShoppingCart
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=RECIPES_BULK_MAX_ITEMS,
+    )
 
-    def validate(self, data):
-        return super().validate(data, "shopping_carts")
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
@@ -0,0 +1,109 @@
+import csv
+import json
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+
+SHOPPING_LIST_FILENAME = "shopping_list"
+SHOPPING_LIST_CHUNK_SIZE = 2000
+
+# Unit -> (canonical unit, how many canonical units it holds). Factors
+# are whole numbers, so converted sums stay exact integers. Only exact
+# measures are listed: spoons and glasses of dry goods have no fixed
+# volume or weight, so they are kept as they are.
+UNIT_CONVERSIONS = {
+    "г": ("г", 1),
+    "кг": ("г", 1000),
+    "мл": ("мл", 1),
+    "л": ("мл", 1000),
+    "шт": ("шт.", 1),
+    "шт.": ("шт.", 1),
+}
+
+
+def canonical_unit(unit):
+    return UNIT_CONVERSIONS.get(unit.strip().lower(), (unit, 1))
+
+
+def normalise(rows):
+    """Merge rows of one ingredient given in convertible units.
+
+    An ingredient is converted only when it appears in several units of
+    one kind, e.g. in grams and kilograms; a single unit is kept as the
+    recipes give it. Rows must be ordered by ingredient name, as the
+    shopping cart query returns them, so every ingredient is merged as
+    soon as it is read and carts of any size go through in a single pass.
+    Sums are Python ints and cannot overflow.
+    """
+    for name, group in groupby(rows, key=itemgetter("ingredient__name")):
+        units = defaultdict(dict)
+        for row in group:
+            unit = row["ingredient__measurement_unit"]
+            amounts = units[canonical_unit(unit)[0]]
+            amounts[unit] = amounts.get(unit, 0) + row["total_amount"]
+
+        totals = {}
+        for canonical, amounts in units.items():
+            if len(amounts) == 1:
+                totals.update(amounts)
+            else:
+                totals[canonical] = sum(
+                    amount * canonical_unit(unit)[1]
+                    for unit, amount in amounts.items()
+                )
+        for unit in sorted(totals):
+            yield {
+                "ingredient__name": name,
+                "ingredient__measurement_unit": unit,
+                "total_amount": totals[unit],
+            }
+
+
+class Echo:
+    """File-like object that hands back what csv.writer writes to it."""
+
+    def write(self, value):
+        return value
+
+
+def to_txt(rows):
+    for row in rows:
+        yield (
+            f"{row['ingredient__name']} - {row['total_amount']} "
+            f"({row['ingredient__measurement_unit']})\n"
+        )
+
+
+def to_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("name", "amount", "measurement_unit"))
+    for row in rows:
+        yield writer.writerow(
+            (
+                row["ingredient__name"],
+                row["total_amount"],
+                row["ingredient__measurement_unit"],
+            )
+        )
+
+
+def to_json(rows):
+    separator = "["
+    for row in rows:
+        yield separator + json.dumps(
+            {
+                "name": row["ingredient__name"],
+                "amount": row["total_amount"],
+                "measurement_unit": row["ingredient__measurement_unit"],
+            },
+            ensure_ascii=False,
+        )
+        separator = ","
+    yield "[]" if separator == "[" else "]"
+
+
+EXPORTERS = {
+    "txt": to_txt,
+    "csv": to_csv,
+    "json": to_json,
+}
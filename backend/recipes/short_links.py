@@ -0,0 +1,51 @@
+"""Compact base62 codes for shared recipe links.
+
+The first character is always a letter, so a code never looks like the
+numeric /s/<id> links shared before codes existed. Lookups go through an
+in-process LRU, then the cache backend, then the database.
+"""
+import string
+from functools import lru_cache
+
+from django.core.cache import cache
+
+from foodgram.constants import SHORT_LINK_CACHE_TIMEOUT, SHORT_LINK_LRU_SIZE
+from recipes.models import ShortLink
+
+LETTERS = string.ascii_letters
+ALPHABET = LETTERS + string.digits
+
+
+def encode(number):
+    """Encode a recipe id; the code is one letter plus base62 digits."""
+    number, first = divmod(number, len(LETTERS))
+    digits = []
+    while number:
+        number, digit = divmod(number, len(ALPHABET))
+        digits.append(ALPHABET[digit])
+    return LETTERS[first] + "".join(reversed(digits))
+
+
+def cache_key(code):
+    return f"short-link:{code}"
+
+
+@lru_cache(maxsize=SHORT_LINK_LRU_SIZE)
+def resolve(code):
+    """Return the recipe id of a code or raise ShortLink.DoesNotExist.
+
+    Misses raise instead of returning None, so they are never cached.
+    """
+    recipe_id = cache.get(cache_key(code))
+    if recipe_id is None:
+        recipe_id = ShortLink.objects.values_list(
+            "recipe_id", flat=True
+        ).get(code=code)
+        cache.set(cache_key(code), recipe_id, SHORT_LINK_CACHE_TIMEOUT)
+    return recipe_id
+
+
+def forget(code):
+    """Drop a removed code from the caches of this process."""
+    cache.delete(cache_key(code))
+    resolve.cache_clear()
@@ -0,0 +1,106 @@
+from functools import partial
+
+from django.db import connections, transaction
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from foodgram.counters import update_counter
+from recipes.feed import backfill, schedule_fan_out, unfollow
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, ShortLink)
+from recipes.pantry_index import pantry_index
+from recipes.search import repair_search_index
+from recipes.short_links import encode, forget
+from recipes.similar import schedule_refill, schedule_refresh
+from users.models import Subscription, User
+
+
+@receiver(post_migrate)
+def restore_search_index(sender, app_config, using, **kwargs):
+    if app_config.label == "recipes":
+        repair_search_index(connections[using])
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def increment_recipe_counter(sender, instance, created, **kwargs):
+    if created:
+        update_counter(Recipe, instance.recipe_id, sender.counter_field, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_recipe_counter(sender, instance, **kwargs):
+    update_counter(Recipe, instance.recipe_id, sender.counter_field, -1)
+
+
+@receiver(post_save, sender=Recipe)
+def increment_author_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        update_counter(User, instance.author_id, "recipes_count", 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_author_recipes_count(sender, instance, **kwargs):
+    update_counter(User, instance.author_id, "recipes_count", -1)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        schedule_fan_out(instance.author, [instance])
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        backfill(instance)
+
+
+@receiver(post_delete, sender=Subscription)
+def clean_feed(sender, instance, **kwargs):
+    unfollow(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_similar_recipes(sender, instance, **kwargs):
+    # Runs after commit, once the ingredients are saved too.
+    schedule_refresh(instance.id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def refill_similar_recipes(sender, instance, **kwargs):
+    # The lists holding the recipe lose it in the cascade.
+    schedule_refill(instance.id)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def update_pantry_index(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(pantry_index.update_recipes, (instance.id,))
+    )
+
+
+@receiver((post_save, post_delete), sender=IngredientInRecipe)
+def update_pantry_index_ingredients(sender, instance, **kwargs):
+    transaction.on_commit(
+        partial(pantry_index.update_recipes, (instance.recipe_id,))
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def create_short_link(sender, instance, created, **kwargs):
+    if created:
+        ShortLink.objects.create(recipe=instance, code=encode(instance.id))
+
+
+@receiver(post_delete, sender=ShortLink)
+def forget_short_link(sender, instance, **kwargs):
+    forget(instance.code)
@@ -0,0 +1,172 @@
+"""Recipes similar by ingredients, ranked by the Jaccard index.
+
+Scoring runs in the database: one GROUP BY over the ingredient rows of
+the recipes sharing an ingredient with the given one computes a row of
+the sparse recipe x ingredient product, and only its best entries are
+kept. Each recipe stores its top SIMILAR_RECIPES_LIMIT neighbours, so a
+read is one indexed lookup. When a recipe's ingredients change, its own
+list is recomputed and the lists of the recipes sharing an ingredient
+with it are patched instead of rebuilding everything; deleting a recipe
+refills the lists that held it. Both run in a worker pool after the
+commit, off the request thread.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (Count, F, FloatField, Min, OuterRef, Subquery,
+                              Value)
+from django.db.models.functions import Cast
+
+from foodgram.constants import SIMILAR_RECIPES_LIMIT
+from foodgram.workers import submit_on_commit
+from recipes.models import IngredientInRecipe, Recipe, SimilarRecipe
+
+
+def candidates(recipe_id, limit):
+    """Return up to limit (or all) (recipe id, score) pairs, best first."""
+    ingredients = IngredientInRecipe.objects.filter(recipe_id=recipe_id)
+    size = ingredients.count()
+    if not size:
+        return []
+
+    other_size = Subquery(
+        IngredientInRecipe.objects.filter(recipe_id=OuterRef("recipe_id"))
+        .order_by()
+        .values("recipe_id")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return list(
+        IngredientInRecipe.objects.filter(
+            ingredient_id__in=ingredients.values("ingredient_id")
+        )
+        .exclude(recipe_id=recipe_id)
+        .order_by()
+        .values("recipe_id")
+        .annotate(shared=Count("id"), other_size=other_size)
+        .annotate(
+            score=Cast("shared", FloatField())
+            / (Value(size) + F("other_size") - F("shared"))
+        )
+        .order_by("-score", "-recipe_id")
+        .values_list("recipe_id", "score")[:limit]
+    )
+
+
+def store(recipe_id, scores):
+    SimilarRecipe.objects.filter(recipe_id=recipe_id).delete()
+    SimilarRecipe.objects.bulk_create(
+        SimilarRecipe(recipe_id=recipe_id, similar_id=other, score=score)
+        for other, score in scores
+    )
+
+
+def trim(recipe_id):
+    """Drop the neighbours beyond SIMILAR_RECIPES_LIMIT."""
+    extra = SimilarRecipe.objects.filter(recipe_id=recipe_id).order_by(
+        "-score", "-similar_id"
+    )[SIMILAR_RECIPES_LIMIT:]
+    SimilarRecipe.objects.filter(
+        pk__in=list(extra.values_list("pk", flat=True))
+    ).delete()
+
+
+@transaction.atomic
+def refresh(recipe_id):
+    """Recompute a recipe's neighbours and patch every list it affects.
+
+    Jaccard scores are symmetric but top lists are not: the recipe may
+    belong in the list of a recipe far outside its own top candidates.
+    So the whole row of scores is computed, and each recipe sharing an
+    ingredient is checked against the weakest entry of its list.
+    """
+    if not Recipe.objects.filter(pk=recipe_id).exists():
+        return
+
+    scores = candidates(recipe_id, None)
+    store(recipe_id, scores[:SIMILAR_RECIPES_LIMIT])
+    new_scores = dict(scores)
+
+    # Lists holding the recipe keep it if it only got closer; otherwise
+    # something else may now outrank it, so they are rebuilt.
+    stale = set()
+    holders = set()
+    closer = []
+    for entry in SimilarRecipe.objects.filter(similar_id=recipe_id):
+        holders.add(entry.recipe_id)
+        score = new_scores.get(entry.recipe_id)
+        if score is None or score < entry.score:
+            stale.add(entry.recipe_id)
+        else:
+            entry.score = score
+            closer.append(entry)
+    SimilarRecipe.objects.bulk_update(closer, ("score",))
+
+    # Recipes sharing an ingredient take it in unless their list is full
+    # of stronger neighbours; ties are settled by trim().
+    lists = {
+        other: (length, weakest)
+        for other, length, weakest in SimilarRecipe.objects.filter(
+            recipe_id__in=IngredientInRecipe.objects.filter(
+                ingredient_id__in=IngredientInRecipe.objects.filter(
+                    recipe_id=recipe_id
+                ).values("ingredient_id")
+            ).values("recipe_id")
+        )
+        .order_by()
+        .values("recipe_id")
+        .annotate(length=Count("id"), weakest=Min("score"))
+        .values_list("recipe_id", "length", "weakest")
+    }
+    entering = {
+        other: score
+        for other, score in scores
+        if other not in holders
+        and (
+            lists.get(other, (0, 0))[0] < SIMILAR_RECIPES_LIMIT
+            or score >= lists[other][1]
+        )
+    }
+    SimilarRecipe.objects.bulk_create(
+        SimilarRecipe(recipe_id=other, similar_id=recipe_id, score=score)
+        for other, score in entering.items()
+    )
+    for other in entering:
+        if lists.get(other, (0, 0))[0] >= SIMILAR_RECIPES_LIMIT:
+            trim(other)
+
+    refill(stale)
+
+
+def refill(recipe_ids):
+    """Rebuild the lists of the given recipes from scratch."""
+    for recipe_id in recipe_ids:
+        with transaction.atomic():
+            store(recipe_id, candidates(recipe_id, SIMILAR_RECIPES_LIMIT))
+
+
+def schedule_refresh(recipe_id):
+    """Refresh the neighbours in the worker pool once the change commits."""
+    submit_on_commit(
+        "similar-recipes", settings.SIMILAR_RECIPES_WORKERS, refresh, recipe_id
+    )
+
+
+def schedule_refill(recipe_id):
+    """Refill the lists a recipe about to be deleted leaves short."""
+    holders = list(
+        SimilarRecipe.objects.filter(similar_id=recipe_id).values_list(
+            "recipe_id", flat=True
+        )
+    )
+    if holders:
+        submit_on_commit(
+            "similar-recipes",
+            settings.SIMILAR_RECIPES_WORKERS,
+            refill,
+            holders,
+        )
+
+
+def rebuild():
+    """Recompute the neighbours of every recipe from scratch."""
+    refill(list(Recipe.objects.values_list("pk", flat=True)))
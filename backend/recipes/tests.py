@@ -0,0 +1,872 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.cache import response_cache_key
+from foodgram.constants import (RECIPE_IMAGE_UPLOAD_TO, SHORT_LINK_RECIPE_URL,
+                                SIMILAR_RECIPES_LIMIT)
+from foodgram.storage import content_addressed_storage
+from recipes.admin import IngredientInRecipeAdmin
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, SimilarRecipe)
+from recipes.pantry_index import pantry_index
+from recipes.short_links import resolve
+from users.models import Subscription, User
+
+RECIPES_URL = "/api/recipes/"
+INGREDIENTS_URL = "/api/ingredients/"
+SUBSCRIPTIONS_URL = "/api/users/subscriptions/"
+USERS_URL = "/api/users/"
+FEED_URL = "/api/recipes/feed/"
+BULK_URL = "/api/recipes/bulk/"
+PAGE_SIZES = (6, 50, 200)
+# A 1x1 GIF.
+IMAGE = (
+    "data:image/gif;base64,"
+    "R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7"
+)
+
+
+def create_user(username):
+    return User.objects.create_user(
+        email=f"{username}@example.com",
+        username=username,
+        first_name="Имя",
+        last_name="Фамилия",
+        password=f"{username}-password",
+    )
+
+
+def authenticated_client(user):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+    return client
+
+
+class RecipeListQueriesTest(TestCase):
+    """The recipe list costs the same number of queries at any page size."""
+
+    # COUNT(*), the page with its authors and the prefetched ingredients;
+    # the ETag validators come from the cache.
+    ANONYMOUS_LIST_QUERIES = 3
+    # Plus the token and the subscribed authors.
+    AUTHENTICATED_LIST_QUERIES = 5
+    ANONYMOUS_DETAIL_QUERIES = 2
+    AUTHENTICATED_DETAIL_QUERIES = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        authors = [create_user(f"author{i}") for i in range(5)]
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {i}", measurement_unit="г")
+            for i in range(30)
+        )
+        ingredients = list(Ingredient.objects.order_by("id"))
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=authors[i % len(authors)],
+                name=f"Рецепт {i}",
+                text="Описание",
+                cooking_time=10,
+            )
+            for i in range(max(PAGE_SIZES))
+        )
+        recipes = list(Recipe.objects.order_by("id"))
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredient=ingredients[(i + k) % len(ingredients)],
+                amount=k + 1,
+            )
+            for i, recipe in enumerate(recipes)
+            for k in range(3)
+        )
+
+    def setUp(self):
+        # Anonymous responses are cached between requests.
+        cache.clear()
+        self.client = authenticated_client(self.user)
+
+    def get_list(self, limit):
+        response = self.client.get(RECIPES_URL, {"limit": limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), limit)
+        return response
+
+    def test_anonymous_list_queries(self):
+        self.client.credentials()
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit):
+                cache.clear()
+                with self.assertNumQueries(self.ANONYMOUS_LIST_QUERIES):
+                    self.get_list(limit)
+
+    def test_authenticated_list_queries(self):
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(self.AUTHENTICATED_LIST_QUERIES):
+                    self.get_list(limit)
+
+    def test_detail_queries(self):
+        recipe = Recipe.objects.order_by("id").first()
+        url = f"{RECIPES_URL}{recipe.id}/"
+
+        with self.assertNumQueries(self.AUTHENTICATED_DETAIL_QUERIES):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["ingredients"]), 3)
+        self.assertEqual(
+            response.data["author"]["username"], recipe.author.username
+        )
+
+        self.client.credentials()
+        with self.assertNumQueries(self.ANONYMOUS_DETAIL_QUERIES):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_user_flags(self):
+        # Skip a few ids, so the relation pks differ from the recipe ids.
+        favorite, in_cart = Recipe.objects.order_by("id")[3:5]
+        Favorite.objects.create(user=self.user, recipe=favorite)
+        ShoppingCart.objects.create(user=self.user, recipe=in_cart)
+
+        flags = {
+            recipe["id"]: (
+                recipe["is_favorited"],
+                recipe["is_in_shopping_cart"],
+            )
+            for recipe in self.get_list(max(PAGE_SIZES)).data["results"]
+        }
+
+        self.assertEqual(flags.pop(favorite.id), (True, False))
+        self.assertEqual(flags.pop(in_cart.id), (False, True))
+        self.assertEqual(set(flags.values()), {(False, False)})
+
+
+class UserListQueriesTest(TestCase):
+    """The user list costs the same number of queries at any page size."""
+
+    # COUNT(*) and the page.
+    ANONYMOUS_LIST_QUERIES = 2
+    # Plus the token and the subscribed authors.
+    AUTHENTICATED_LIST_QUERIES = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        User.objects.bulk_create(
+            User(
+                email=f"author{i}@example.com",
+                username=f"author{i}",
+                first_name="Имя",
+                last_name="Фамилия",
+            )
+            for i in range(max(PAGE_SIZES))
+        )
+        Subscription.objects.bulk_create(
+            Subscription(subscriber=cls.user, author=author)
+            for author in User.objects.exclude(pk=cls.user.pk)[::2]
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = authenticated_client(self.user)
+
+    def get_list(self, limit):
+        response = self.client.get(USERS_URL, {"limit": limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), limit)
+        return response
+
+    def test_anonymous_list_queries(self):
+        self.client.credentials()
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit):
+                cache.clear()
+                with self.assertNumQueries(self.ANONYMOUS_LIST_QUERIES):
+                    self.get_list(limit)
+
+    def test_authenticated_list_queries(self):
+        for limit in PAGE_SIZES:
+            with self.subTest(limit=limit):
+                with self.assertNumQueries(self.AUTHENTICATED_LIST_QUERIES):
+                    self.get_list(limit)
+
+    def test_is_subscribed(self):
+        followed = set(
+            Subscription.objects.filter(subscriber=self.user).values_list(
+                "author_id", flat=True
+            )
+        )
+
+        response = self.get_list(max(PAGE_SIZES))
+
+        for user in response.data["results"]:
+            self.assertEqual(user["is_subscribed"], user["id"] in followed)
+
+
+class SubscriptionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.author = create_user("author")
+        for i in range(5):
+            Recipe.objects.create(
+                author=cls.author,
+                name=f"Рецепт {i}",
+                text="Описание",
+                cooking_time=10,
+            )
+
+    def setUp(self):
+        self.client = authenticated_client(self.user)
+
+    def test_no_subscriptions_with_recipes_limit(self):
+        response = self.client.get(SUBSCRIPTIONS_URL, {"recipes_limit": 3})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"], [])
+
+    def test_recipes_limit(self):
+        Subscription.objects.create(subscriber=self.user, author=self.author)
+
+        response = self.client.get(SUBSCRIPTIONS_URL, {"recipes_limit": 3})
+
+        self.assertEqual(response.status_code, 200)
+        (author,) = response.data["results"]
+        self.assertEqual(len(author["recipes"]), 3)
+        self.assertEqual(author["recipes_count"], 5)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.ingredient = Ingredient.objects.create(
+            name="мука", measurement_unit="г"
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name="Блины", text="Описание", cooking_time=10
+        )
+        cls.amount = IngredientInRecipe.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=200
+        )
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+        self.client = APIClient()
+
+    def assertNotModified(self, url, modified, **headers):
+        """The ETag of url holds until modified() runs."""
+        etag = self.client.get(url, **headers)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            modified()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_ingredients_from_memory(self):
+        self.client.get(INGREDIENTS_URL)
+        cache.clear()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(INGREDIENTS_URL, {"name": "му"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_ingredient_rename(self):
+        def rename():
+            self.ingredient.name = "мука пшеничная"
+            self.ingredient.save()
+
+        self.assertNotModified(INGREDIENTS_URL, rename)
+
+    def test_ingredients_last_modified(self):
+        last_modified = self.client.get(INGREDIENTS_URL)["Last-Modified"]
+        cache.clear()
+
+        response = self.client.get(
+            INGREDIENTS_URL, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_recipe_author_change(self):
+        def rename():
+            self.user.first_name = "Другое"
+            self.user.save()
+
+        self.assertNotModified(f"{RECIPES_URL}{self.recipe.id}/", rename)
+
+    def test_favorite_toggle(self):
+        client = authenticated_client(self.user)
+        etag = client.get(RECIPES_URL)["ETag"]
+
+        client.post(f"{RECIPES_URL}{self.recipe.id}/favorite/")
+
+        response = client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["results"][0]["is_favorited"])
+
+    def test_admin_amount_change(self):
+        request = RequestFactory().post("/")
+        request.user = AnonymousUser()
+        updated = self.recipe.updated
+
+        def change_amount():
+            self.amount.amount = 300
+            IngredientInRecipeAdmin(IngredientInRecipe, None).save_model(
+                request, self.amount, None, True
+            )
+
+        self.assertNotModified(
+            f"{RECIPES_URL}{self.recipe.id}/", change_amount
+        )
+        self.recipe.refresh_from_db()
+        self.assertGreater(self.recipe.updated, updated)
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        Ingredient.objects.create(name="мука", measurement_unit="г")
+
+    def is_cached(self, url, accept):
+        request = RequestFactory().get(url, HTTP_ACCEPT=accept)
+        return cache.get(response_cache_key(request)) is not None
+
+    def test_json_lists_are_cached(self):
+        for url in (RECIPES_URL, INGREDIENTS_URL):
+            with self.subTest(url=url):
+                self.client.get(url, HTTP_ACCEPT="application/json")
+                self.assertTrue(self.is_cached(url, "application/json"))
+
+    def test_browsable_api_is_not_cached(self):
+        self.client.get(RECIPES_URL, HTTP_ACCEPT="text/html")
+        self.assertFalse(self.is_cached(RECIPES_URL, "text/html"))
+
+
+class SubscriptionFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.author = create_user("author")
+        Subscription.objects.create(subscriber=cls.user, author=cls.author)
+
+    def test_new_recipe_fans_out(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.author,
+                name="Блины",
+                text="Описание",
+                cooking_time=10,
+            )
+
+        response = authenticated_client(self.user).get(FEED_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["id"] for item in response.data["results"]], [recipe.id]
+        )
+
+
+class CleanMediaTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def save_orphan(self, content):
+        name = content_addressed_storage.save(
+            f"{RECIPE_IMAGE_UPLOAD_TO}photo.jpg", ContentFile(content)
+        )
+        long_ago = time.time() - 2 * 60 * 60
+        os.utime(content_addressed_storage.path(name), (long_ago, long_ago))
+        return name
+
+    def test_reupload_of_orphan_survives(self):
+        reused = self.save_orphan(b"reused")
+        orphan = self.save_orphan(b"orphan")
+
+        self.assertEqual(
+            content_addressed_storage.save(
+                f"{RECIPE_IMAGE_UPLOAD_TO}again.jpg", ContentFile(b"reused")
+            ),
+            reused,
+        )
+        call_command("clean_media", stdout=StringIO())
+
+        self.assertTrue(content_addressed_storage.exists(reused))
+        self.assertFalse(content_addressed_storage.exists(orphan))
+
+
+class SimilarRecipesTest(TestCase):
+    """Incremental updates keep every list equal to a brute-force ranking."""
+
+    def setUp(self):
+        self.random = random.Random(1)
+        self.author = create_user("author")
+        self.pool = Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {i}", measurement_unit="г")
+            for i in range(30)
+        )
+        self.pool = list(Ingredient.objects.all())
+
+    def set_ingredients(self, recipe):
+        IngredientInRecipe.objects.filter(recipe=recipe).delete()
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in self.random.sample(
+                self.pool, self.random.randint(2, 8)
+            )
+        )
+        recipe.save()
+
+    def assertListsExact(self):
+        ingredients = {}
+        for recipe_id, ingredient_id in IngredientInRecipe.objects.values_list(
+            "recipe_id", "ingredient_id"
+        ):
+            ingredients.setdefault(recipe_id, set()).add(ingredient_id)
+
+        for recipe_id, own in ingredients.items():
+            expected = sorted(
+                (
+                    (-round(len(own & other) / len(own | other), 9), -pk)
+                    for pk, other in ingredients.items()
+                    if pk != recipe_id and own & other
+                )
+            )[:SIMILAR_RECIPES_LIMIT]
+            stored = [
+                (-round(score, 9), -pk)
+                for pk, score in SimilarRecipe.objects.filter(
+                    recipe_id=recipe_id
+                )
+                .order_by("-score", "-similar_id")
+                .values_list("similar_id", "score")
+            ]
+            self.assertEqual(stored, expected, recipe_id)
+
+    def test_create_update_delete(self):
+        recipes = []
+        for i in range(80):
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe = Recipe.objects.create(
+                    author=self.author,
+                    name=f"Рецепт {i}",
+                    text="Описание",
+                    cooking_time=10,
+                )
+                self.set_ingredients(recipe)
+            recipes.append(recipe)
+        self.assertListsExact()
+
+        for recipe in self.random.sample(recipes, 30):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.set_ingredients(recipe)
+        self.assertListsExact()
+
+        for recipe in self.random.sample(recipes, 10):
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe.delete()
+        self.assertListsExact()
+
+
+class PantryIndexTest(TestCase):
+    """Pantry matches equal a brute-force ranking, before and after edits."""
+
+    def setUp(self):
+        self.random = random.Random(2)
+        self.author = create_user("author")
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {i}", measurement_unit="г")
+            for i in range(40)
+        )
+        self.pool = list(Ingredient.objects.values_list("id", flat=True))
+        self.recipes = []
+        for i in range(150):
+            recipe = Recipe.objects.create(
+                author=self.author,
+                name=f"Рецепт {i}",
+                text="Описание",
+                cooking_time=10,
+            )
+            self.set_ingredients(recipe)
+            self.recipes.append(recipe)
+        pantry_index.invalidate()
+
+    def set_ingredients(self, recipe):
+        IngredientInRecipe.objects.filter(recipe=recipe).delete()
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=1
+            )
+            for ingredient_id in self.random.sample(
+                self.pool, self.random.randint(1, 9)
+            )
+        )
+
+    def brute_force(self, pantry, limit):
+        ingredients = {}
+        for recipe_id, ingredient_id in IngredientInRecipe.objects.values_list(
+            "recipe_id", "ingredient_id"
+        ):
+            ingredients.setdefault(recipe_id, set()).add(ingredient_id)
+        ranked = sorted(
+            (len(own - pantry), -len(own & pantry), -recipe_id)
+            for recipe_id, own in ingredients.items()
+            if own & pantry
+        )[:limit]
+        return [
+            (-recipe_id, -matched, missing)
+            for missing, matched, recipe_id in ranked
+        ]
+
+    def assertMatchesExact(self):
+        for _ in range(30):
+            pantry = set(
+                self.random.sample(self.pool, self.random.randint(1, 15))
+            )
+            self.assertEqual(
+                pantry_index.match(pantry, 25), self.brute_force(pantry, 25)
+            )
+
+    def test_match(self):
+        self.assertMatchesExact()
+
+        for recipe in self.random.sample(self.recipes, 30):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.set_ingredients(recipe)
+                recipe.save()
+        for recipe in self.random.sample(self.recipes, 5):
+            with self.captureOnCommitCallbacks(execute=True):
+                recipe.delete()
+        self.assertMatchesExact()
+
+
+class BulkImportTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("author")
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"ингредиент {i}", measurement_unit="г")
+            for i in range(3)
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = authenticated_client(self.user)
+
+    def item(self, name, ingredient_ids):
+        return {
+            "name": name,
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": IMAGE,
+            "ingredients": [
+                {"id": ingredient_id, "amount": 100}
+                for ingredient_id in ingredient_ids
+            ],
+        }
+
+    def test_all_created(self):
+        ids = [ingredient.id for ingredient in Ingredient.objects.all()]
+        response = self.client.post(
+            BULK_URL,
+            [self.item("Блины", ids[:2]), self.item("Оладьи", ids[1:])],
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([result["index"] for result in response.data], [0, 1])
+        for result, ingredient_ids in zip(response.data, (ids[:2], ids[1:])):
+            self.assertCountEqual(
+                IngredientInRecipe.objects.filter(
+                    recipe_id=result["id"]
+                ).values_list("ingredient_id", flat=True),
+                ingredient_ids,
+            )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 2)
+
+    def test_partial_success_from_ndjson(self):
+        ids = [ingredient.id for ingredient in Ingredient.objects.all()]
+        items = [
+            self.item("Блины", ids),
+            self.item("Без ингредиентов", []),
+            self.item("Неизвестный ингредиент", [max(ids) + 1]),
+            self.item("Оладьи", ids[:1]),
+        ]
+        response = self.client.post(
+            BULK_URL,
+            "\n".join(json.dumps(item) for item in items),
+            content_type="application/x-ndjson",
+        )
+
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual(
+            [result["index"] for result in response.data], [0, 1, 2, 3]
+        )
+        self.assertIn("id", response.data[0])
+        self.assertIn("errors", response.data[1])
+        self.assertIn("errors", response.data[2])
+        self.assertIn("id", response.data[3])
+        self.assertCountEqual(
+            Recipe.objects.values_list("name", flat=True), ["Блины", "Оладьи"]
+        )
+
+    def test_empty_list(self):
+        response = self.client.post(BULK_URL, [], format="json")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class BatchToggleTest(TestCase):
+    RELATIONS = (
+        ("favorite", Favorite, "favorites_count"),
+        ("shopping_cart", ShoppingCart, "shopping_carts_count"),
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.other = create_user("other")
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.other,
+                name=f"Рецепт {i}",
+                text="Описание",
+                cooking_time=10,
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client = authenticated_client(self.user)
+
+    def toggle(self, method, path, recipe_ids):
+        response = getattr(self.client, method)(
+            f"{RECIPES_URL}{path}/batch/",
+            {"recipes": recipe_ids},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return {item["id"]: item["status"] for item in response.data}
+
+    def assertCounts(self, counter_field, counts):
+        self.assertEqual(
+            [
+                getattr(recipe, counter_field)
+                for recipe in Recipe.objects.order_by("id")
+            ],
+            counts,
+        )
+
+    def test_add_and_remove(self):
+        first, second, third = (recipe.id for recipe in self.recipes)
+        missing = third + 1
+        for path, model, counter_field in self.RELATIONS:
+            with self.subTest(path=path):
+                model.objects.create(user=self.other, recipe_id=first)
+                model.objects.create(user=self.user, recipe_id=second)
+
+                self.assertEqual(
+                    self.toggle("post", path, [first, second, missing]),
+                    {first: "added", second: "exists", missing: "not_found"},
+                )
+                self.assertCounts(counter_field, [2, 1, 0])
+
+                self.assertEqual(
+                    self.toggle("delete", path, [first, third]),
+                    {first: "removed", third: "missing"},
+                )
+                self.assertCounts(counter_field, [1, 1, 0])
+                self.assertCountEqual(
+                    model.objects.filter(user=self.user).values_list(
+                        "recipe_id", flat=True
+                    ),
+                    [second],
+                )
+
+    def test_invalid_payload(self):
+        response = self.client.post(
+            f"{RECIPES_URL}favorite/batch/", {"recipes": []}, format="json"
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ToggleTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user("reader")
+        cls.recipe = Recipe.objects.create(
+            author=create_user("author"),
+            name="Блины",
+            text="Описание",
+            cooking_time=10,
+        )
+
+    def setUp(self):
+        self.client = authenticated_client(self.user)
+
+    def test_toggles(self):
+        for path, counter_field in (
+            ("favorite", "favorites_count"),
+            ("shopping_cart", "shopping_carts_count"),
+        ):
+            url = f"{RECIPES_URL}{self.recipe.id}/{path}/"
+            with self.subTest(path=path):
+                for method, status_code, count in (
+                    ("post", 201, 1),
+                    ("post", 400, 1),
+                    ("delete", 204, 0),
+                    ("delete", 400, 0),
+                ):
+                    response = getattr(self.client, method)(url)
+
+                    self.assertEqual(response.status_code, status_code)
+                    self.recipe.refresh_from_db()
+                    self.assertEqual(
+                        getattr(self.recipe, counter_field), count
+                    )
+
+    def test_missing_recipe(self):
+        response = self.client.post(
+            f"{RECIPES_URL}{self.recipe.id + 1}/favorite/"
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_row_inserted_by_another_request(self):
+        # A concurrent request got its row in first: the insert is skipped
+        # instead of failing on the unique constraint, and counted once.
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+
+        self.assertFalse(Favorite.objects.add(self.user, self.recipe.id))
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+        self.assertTrue(Favorite.objects.remove(self.user, self.recipe.id))
+        self.assertFalse(Favorite.objects.remove(self.user, self.recipe.id))
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+
+
+class CursorPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user("author")
+        for i in range(13):
+            Recipe.objects.create(
+                author=author,
+                name=f"Рецепт {i}",
+                text="Описание",
+                cooking_time=10,
+            )
+        # Ties on created are broken by id.
+        first = Recipe.objects.order_by("id").first()
+        Recipe.objects.filter(id__lte=first.id + 5).update(
+            created=first.created
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertNotIn("count", data)
+            pages.append([item["id"] for item in data["results"]])
+            url = data[link]
+        return pages
+
+    def test_walk_forward_and_back(self):
+        expected = list(
+            Recipe.objects.order_by("-created", "-id").values_list(
+                "id", flat=True
+            )
+        )
+
+        forward = self.walk(f"{RECIPES_URL}?cursor=&limit=5", "next")
+        self.assertEqual(
+            forward, [expected[:5], expected[5:10], expected[10:]]
+        )
+
+        last_page = self.client.get(f"{RECIPES_URL}?cursor=&limit=5").json()
+        for _ in range(len(forward) - 1):
+            last_page = self.client.get(last_page["next"]).json()
+        backward = self.walk(last_page["previous"], "previous")
+        self.assertEqual(backward, [expected[5:10], expected[:5]])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(RECIPES_URL, {"cursor": "broken"})
+
+        self.assertEqual(response.status_code, 404)
+
+
+class ShortLinkTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = Recipe.objects.create(
+            author=create_user("author"),
+            name="Блины",
+            text="Описание",
+            cooking_time=10,
+        )
+
+    def setUp(self):
+        cache.clear()
+        resolve.cache_clear()
+
+    def test_short_link_redirects(self):
+        response = self.client.get(f"{RECIPES_URL}{self.recipe.id}/get-link/")
+
+        self.assertEqual(response.status_code, 200)
+        host, path = response.data["short-link"].split("/", 1)
+        self.assertEqual(host, "testserver")
+        code = path.rsplit("/", 1)[1]
+        self.assertFalse(code.isdigit())
+        for _ in range(2):
+            self.assertRedirects(
+                self.client.get(f"/{path}"),
+                SHORT_LINK_RECIPE_URL.format(self.recipe.id),
+                fetch_redirect_response=False,
+            )
+
+    def test_legacy_link_redirects(self):
+        self.assertRedirects(
+            self.client.get(f"/s/{self.recipe.id}"),
+            SHORT_LINK_RECIPE_URL.format(self.recipe.id),
+            fetch_redirect_response=False,
+        )
+
+    def test_unknown_code(self):
+        response = self.client.get("/s/Zzzzz")
+
+        self.assertEqual(response.status_code, 404)
@@ -1,24 +1,52 @@
+import json
+
+from django.db import connections
 from django.db.models import Sum
-from django.http import FileResponse, HttpResponse
+from django.http import (Http404, HttpResponse, HttpResponseRedirect,
+                         StreamingHttpResponse)
+from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import (AllowAny, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
-from api.pagination import MainPagePagination
+from api.cache import (AnonymousResponseCacheMixin, bump_user_version,
+                       get_content_version, get_user_version)
+from api.conditional import ConditionalGetMixin, make_etag
+from api.pagination import RecipeFeedPagination, SubscriptionFeedPagination
+from api.parsers import NDJSONParser
 from api.permissions import IsAuthorOrReadOnly
+from api.renderers import CSVRenderer, PlainTextRenderer
+from foodgram.constants import (INGREDIENT_SEARCH_LIMIT,
+                                RECIPES_BULK_MAX_ITEMS, SHORT_LINK_RECIPE_URL,
+                                SIMILAR_RECIPES_LIMIT)
+from recipes.bulk import (add_user_recipes, create_recipes,
+                          existing_ingredient_ids, remove_user_recipes)
+from recipes.feed import SubscriptionFeed
 from recipes.filters import IngredientFilter, RecipeFilter
+from recipes.ingredient_index import ingredient_index
 from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart)
-from recipes.serializers import (CreateRecipeSerializer, FavoriteSerializer,
-                                 RecipeSerializer, ShoppingCartSerializer,
-                                 ShortIngredientsSerializer)
-import tempfile
+                            ShoppingCart, ShortLink)
+from recipes.pantry_index import pantry_index
+from recipes.serializers import (CreateRecipeSerializer,
+                                 PantryQuerySerializer, PantryRecipeSerializer,
+                                 RecipeIdsSerializer, RecipeSerializer,
+                                 ShortIngredientsSerializer,
+                                 ShortRecipeSerializer)
+from recipes.shopping_list import (EXPORTERS, SHOPPING_LIST_CHUNK_SIZE,
+                                   SHOPPING_LIST_FILENAME, normalise)
+from recipes.short_links import encode, resolve
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    AnonymousResponseCacheMixin,
+    ConditionalGetMixin,
+    viewsets.ReadOnlyModelViewSet,
+):
     queryset = Ingredient.objects.all()
     serializer_class = ShortIngredientsSerializer
     permission_classes = (AllowAny,)
@@ -26,14 +54,80 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     search_fields = ("^name",)
 
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.list_from_index, request, *args, **kwargs
+        )
+
+    def list_from_index(self, request, *args, **kwargs):
+        limit = request.query_params.get("limit")
+        limit = int(limit) if limit and limit.isdigit() else None
+        search = request.query_params.get("search", "").strip()
+
+        if search:
+            content = self.search_json(
+                search, limit or INGREDIENT_SEARCH_LIMIT
+            )
+        else:
+            content = ingredient_index.search_json(
+                request.query_params.get("name", ""), limit
+            )
+
+        return HttpResponse(content, content_type="application/json")
+
+    def search_json(self, search, limit):
+        """Rank ingredients by trigram similarity to the search string."""
+        if connections[self.queryset.db].vendor != "postgresql":
+            return ingredient_index.similar_json(search, limit)
+
+        return json.dumps(
+            list(
+                Ingredient.objects.similar_to(search).values(
+                    "id", "name", "measurement_unit"
+                )[:limit]
+            ),
+            ensure_ascii=False,
+        )
+
+    def get_validators(self, request, *args, **kwargs):
+        digest, changed = ingredient_index.validators()
+        return make_etag("ingredients", digest), changed
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
-    queryset = Recipe.objects.all()
-    pagination_class = MainPagePagination
+class RecipeViewSet(
+    AnonymousResponseCacheMixin, ConditionalGetMixin, viewsets.ModelViewSet
+):
+    pagination_class = RecipeFeedPagination
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        queryset = Recipe.objects.with_user_flags(self.request.user)
+
+        if self.action in ("list", "retrieve"):
+            return queryset.with_related()
+
+        return queryset
+
+    def get_validators(self, request, *args, **kwargs):
+        """ETag from the content version and the user's own version.
+
+        Both are kept in the cache by api/signals.py, so a 304 costs no
+        query. No Last-Modified: a timestamp cannot tell that a recipe was
+        deleted or that the user changed their favorites, cart or
+        subscriptions.
+        """
+        user = request.user
+        return (
+            make_etag(
+                "recipes",
+                get_content_version(),
+                user.is_authenticated and get_user_version(user.pk),
+            ),
+            None,
+        )
+
     def get_serializer_class(self):
         if self.action in ("create", "partial_update"):
             return CreateRecipeSerializer
@@ -45,6 +139,74 @@ class RecipeViewSet(viewsets.ModelViewSet):
         context.update({"request": self.request})
         return context
 
+    @action(
+        detail=False,
+        methods=("get",),
+        permission_classes=(IsAuthenticated,),
+        url_path="feed",
+        url_name="feed",
+    )
+    def feed(self, request):
+        paginator = SubscriptionFeedPagination()
+        page = paginator.paginate_queryset(
+            SubscriptionFeed(request.user), request, self
+        )
+        serializer = RecipeSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=("post",),
+        permission_classes=(IsAuthenticated,),
+        parser_classes=(JSONParser, NDJSONParser),
+        url_path="bulk",
+        url_name="bulk",
+    )
+    def bulk(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                "Ожидается непустой список рецептов.",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > RECIPES_BULK_MAX_ITEMS:
+            return Response(
+                f"Не больше {RECIPES_BULK_MAX_ITEMS} рецептов за запрос.",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        context = self.get_serializer_context()
+        context["existing_ingredient_ids"] = existing_ingredient_ids(items)
+
+        results = []
+        valid = []
+        for index, item in enumerate(items):
+            serializer = CreateRecipeSerializer(data=item, context=context)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results.append({"index": index, "errors": serializer.errors})
+
+        recipes = create_recipes(
+            request.user, [validated for _, validated in valid]
+        )
+        results.extend(
+            {"index": index, "id": recipe.id}
+            for (index, _), recipe in zip(valid, recipes)
+        )
+        results.sort(key=lambda result: result["index"])
+
+        return Response(
+            results,
+            status=(
+                status.HTTP_207_MULTI_STATUS
+                if len(valid) < len(items)
+                else status.HTTP_201_CREATED
+            ),
+        )
+
     @action(
         detail=True,
         methods=("post", "delete"),
@@ -55,14 +217,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def favorite(self, request, pk):
         if request.method == "POST":
             return self.create_user_recipe_relation(
-                request, pk, FavoriteSerializer
+                request, pk, Favorite, "Рецепт уже в избранном."
             )
         return self.delete_user_recipe_relation(
-            request,
-            pk,
-            "favorites",
-            Favorite.DoesNotExist,
-            "Рецепт не в избранном.",
+            request, pk, Favorite, "Рецепт не в избранном."
         )
 
     @action(
@@ -75,46 +233,84 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def shopping_cart(self, request, pk):
         if request.method == "POST":
             return self.create_user_recipe_relation(
-                request, pk, ShoppingCartSerializer
+                request,
+                pk,
+                ShoppingCart,
+                "Рецепт уже в списке покупок (корзине).",
             )
         return self.delete_user_recipe_relation(
             request,
             pk,
-            "shopping_carts",
-            ShoppingCart.DoesNotExist,
+            ShoppingCart,
             "Рецепт не в списке покупок (корзине).",
         )
 
-    def create_user_recipe_relation(self, request, pk, serializer_class):
-        serializer = serializer_class(
-            data={
-                "user": request.user.id,
-                "recipe": pk,
-            }
-        )
+    @action(
+        detail=False,
+        methods=("post", "delete"),
+        permission_classes=(IsAuthenticated,),
+        url_path="favorite/batch",
+        url_name="favorite-batch",
+    )
+    def favorite_batch(self, request):
+        return self.change_user_recipe_relations(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=("post", "delete"),
+        permission_classes=(IsAuthenticated,),
+        url_path="shopping_cart/batch",
+        url_name="shopping_cart-batch",
+    )
+    def shopping_cart_batch(self, request):
+        return self.change_user_recipe_relations(request, ShoppingCart)
 
+    def change_user_recipe_relations(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
 
+        change = (
+            add_user_recipes
+            if request.method == "POST"
+            else remove_user_recipes
+        )
+        outcomes = change(
+            model, request.user, serializer.validated_data["recipes"]
+        )
+        # The raw inserts and deletes send no signals.
+        bump_user_version(request.user.pk)
+
+        return Response(
+            [
+                {"id": recipe_id, "status": outcome}
+                for recipe_id, outcome in outcomes.items()
+            ]
+        )
+
+    def create_user_recipe_relation(self, request, pk, model, exists_message):
+        recipe = get_object_or_404(Recipe, pk=pk)
+
+        if not model.objects.add(request.user, recipe.pk):
+            return Response(
+                exists_message,
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        bump_user_version(request.user.pk)
+
+        serializer = ShortRecipeSerializer(
+            recipe, context=self.get_serializer_context()
+        )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_user_recipe_relation(
-        self,
-        request,
-        pk,
-        related_name_for_user,
-        does_not_exist_exception,
-        does_not_exist_message,
+        self, request, pk, model, does_not_exist_message
     ):
-        try:
-            getattr(request.user, related_name_for_user).get(
-                user=request.user, recipe_id=pk
-            ).delete()
-        except does_not_exist_exception:
+        if not model.objects.remove(request.user, pk):
             return Response(
                 does_not_exist_message,
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        bump_user_version(request.user.pk)
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -122,32 +318,82 @@ class RecipeViewSet(viewsets.ModelViewSet):
         detail=False,
         methods=("get",),
         permission_classes=(IsAuthenticated,),
+        renderer_classes=(PlainTextRenderer, CSVRenderer, JSONRenderer),
         url_path="download_shopping_cart",
         url_name="download_shopping_cart",
     )
     def download_shopping_cart(self, request):
         ingredients = (
             IngredientInRecipe.objects.filter(
-                recipe__shopping_recipe__user=request.user
+                recipe__shopping_carts__user=request.user
             )
             .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(sum=Sum("amount"))
+            .annotate(total_amount=Sum("amount"))
+            .order_by("ingredient__name", "ingredient__measurement_unit")
         )
 
-        return self.ingredients_to_txt(ingredients)
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            EXPORTERS[renderer.format](
+                normalise(
+                    ingredients.iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+                )
+            ),
+            content_type=f"{renderer.media_type}; charset=utf-8",
+        )
+        response["Content-Disposition"] = (
+            "attachment; "
+            f'filename="{SHOPPING_LIST_FILENAME}.{renderer.format}"'
+        )
+
+        return response
+
+    @action(
+        detail=False,
+        methods=("get",),
+        permission_classes=(AllowAny,),
+        url_path="pantry",
+        url_name="pantry",
+    )
+    def pantry(self, request):
+        query = PantryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
 
+        matches = pantry_index.match(
+            query.validated_data["ingredients"], query.validated_data["limit"]
+        )
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in matches]
+        )
+        page = []
+        for recipe_id, matched, missing in matches:
+            recipe = recipes.get(recipe_id)
+            if recipe is not None:
+                recipe.matched, recipe.missing = matched, missing
+                page.append(recipe)
 
-    @staticmethod
-    def ingredients_to_txt(ingredients):
-        shopping_list = "\n".join(
-            f"{ingredient['ingredient_name']} - {ingredient['sum']} "
-            f"({ingredient['ingredient__measurement_unit']})"
-            for ingredient in ingredients
+        serializer = PantryRecipeSerializer(
+            page, many=True, context=self.get_serializer_context()
         )
-        temp_file = tempfile.NamedTemporaryFile(mode="w+", delete=False, suffix=".txt")
-        temp_file.write(shopping_list)
-        temp_file.seek(0)
-        return FileResponse(temp_file, as_attachment=True, filename="shoping_list.txt", content_type="text/plain")
+        return Response(serializer.data)
+
+    @action(
+        detail=True,
+        methods=("get",),
+        permission_classes=(AllowAny,),
+        url_path="similar",
+        url_name="similar",
+    )
+    def similar(self, request, pk):
+        recipe = get_object_or_404(Recipe, pk=pk)
+        similar = Recipe.objects.filter(
+            similar_of__recipe=recipe
+        ).order_by("-similar_of__score", "-id")[:SIMILAR_RECIPES_LIMIT]
+
+        serializer = ShortRecipeSerializer(
+            similar, many=True, context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
 
     @action(
         detail=True,
@@ -158,7 +404,25 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def get_link(self, request, pk):
         instance = self.get_object()
+        short_link, _ = ShortLink.objects.get_or_create(
+            recipe=instance, defaults={"code": encode(instance.id)}
+        )
 
-        url = f"{request.get_host()}/s/{instance.id}"
+        url = f"{request.get_host()}/s/{short_link.code}"
 
         return Response(data={"short-link": url})
+
+
+def resolve_short_link(request, code):
+    """Redirect a short link to the recipe page of the frontend."""
+    try:
+        recipe_id = resolve(code)
+    except ShortLink.DoesNotExist:
+        raise Http404("Короткая ссылка не найдена.")
+
+    return HttpResponseRedirect(SHORT_LINK_RECIPE_URL.format(recipe_id))
+
+
+def resolve_legacy_link(request, pk):
+    """Redirect the numeric links shared before short codes existed."""
+    return HttpResponseRedirect(SHORT_LINK_RECIPE_URL.format(pk))
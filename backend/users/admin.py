@@ -1,4 +1,3 @@
-from django.contrib import admin
 from django.contrib.admin import register
 from django.contrib.auth.admin import UserAdmin
 
@@ -18,13 +17,6 @@ class UserAdminConfig(UserAdmin):
         "recipes_count",
         "subscribers_count",
     )
-    list_filter = ("username", "email")
+    list_filter = ("is_staff", "is_superuser", "is_active")
     search_fields = ("username", "email")
-
-    @admin.display(description="Количество рецептов")
-    def recipes_count(self, obj):
-        return obj.recipes.count()
-
-    @admin.display(description="Количество подписчиков")
-    def subscribers_count(self, obj):
-        return obj.subscriptions_where_author.count()
+    show_full_result_count = False
@@ -6,6 +6,7 @@ from foodgram.constants import (USER_AVATAR_UPLOAD_TO, USER_EMAIL_MAX_LENGTH,
                                 USER_FIRST_NAME_MAX_LENGTH,
                                 USER_LAST_NAME_MAX_LENGTH,
                                 USER_USERNAME_MAX_LENGTH, USER_USERNAME_REGEX)
+from foodgram.storage import content_addressed_storage
 
 
 class User(AbstractUser):
@@ -36,8 +37,19 @@ class User(AbstractUser):
     avatar = models.ImageField(
         verbose_name="Аватар пользователя",
         upload_to=USER_AVATAR_UPLOAD_TO,
+        storage=content_addressed_storage,
         blank=True,
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество рецептов",
+    )
+    subscribers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Количество подписчиков",
+    )
 
     class Meta:
         verbose_name = "Пользователь"
@@ -7,18 +7,25 @@ from users.models import Subscription
 
 class SubscriptionSerializer(UserProfileSerializer):
     recipes = serializers.SerializerMethodField(method_name="get_recipes")
-    recipes_count = serializers.ReadOnlyField(source="recipes.count")
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta(UserProfileSerializer.Meta):
-        fields = UserProfileSerializer.Meta.fields
+        fields = UserProfileSerializer.Meta.fields + (
+            "recipes",
+            "recipes_count",
+        )
 
     def get_recipes(self, obj):
         request = self.context.get("request")
-        recipes = obj.recipes.all()
-        recipes_limit = request.query_params.get("recipes_limit")
 
-        if recipes_limit and recipes_limit.isdigit():
-            recipes = recipes[:int(recipes_limit)]
+        if hasattr(obj, "limited_recipes"):
+            recipes = obj.limited_recipes
+        else:
+            recipes = obj.recipes.all()
+            recipes_limit = request.query_params.get("recipes_limit")
+
+            if recipes_limit and recipes_limit.isdigit():
+                recipes = recipes[:int(recipes_limit)]
 
         return ShortRecipeSerializer(
             recipes, context={"request": request}, many=True
@@ -26,8 +33,6 @@ class SubscriptionSerializer(UserProfileSerializer):
 
 
 class CreateSubscriptionSerializer(serializers.ModelSerializer):
-    recipes_count = serializers.ReadOnlyField(source="author.recipes.count")
-
     class Meta:
         model = Subscription
         fields = ("author", "subscriber")
@@ -36,21 +41,11 @@ class CreateSubscriptionSerializer(serializers.ModelSerializer):
             "subscriber": {"write_only": True},
         }
 
-
     def to_representation(self, instance):
-        data = UserProfileSerializer(
+        return SubscriptionSerializer(
             instance.author, context={"request": self.context["request"]}
         ).data
 
-        data["recipes"] = SubscriptionSerializer(
-            instance.author.recipes.all(),
-            many=True,
-            context={"request": self.context["request"]}
-        ).data
-
-        data["recipes_count"] = instance.author.recipes.count()
-        return data
-
     def validate(self, data):
         if data["subscriber"] == data["author"]:
             raise serializers.ValidationError(